@@ -99,6 +99,16 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.'
@@ -131,4 +141,5 @@ MEDIA_URL = "/my_media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "my_media")
 
 RECIPES_LIMIT = 6
+RECIPE_LIST_CACHE = os.environ.get('RECIPE_LIST_CACHE', 'False') == 'True'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -1,10 +1,164 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
 
+from .cards import refresh_recipe_cards
+from .catalog import bump_catalog_version_on_commit
+from .cooccurrence import change_ingredient_pairs, recipe_ingredient_ids
+from .counters import count_added, count_removed
+from .feed import fan_out_recipe
 from .models import Recipe, Ingredient, Tag, ShoppingCart, Favorite
+from .recipe_cache import invalidate_recipe
+from .relations import invalidate_user_relations
+from .shopping_list import (add_to_shopping_list, rebuild_shopping_lists,
+                            remove_from_shopping_list)
+from .similarity import listing_recipes, rebuild_similar_recipes
+
+User = get_user_model()
+
+
+class FixedOnChangeAdminMixin:
+    fixed_on_change = ()
+
+    def get_readonly_fields(self, request, obj=None):
+        readonly_fields = super().get_readonly_fields(request, obj)
+        if obj is None:
+            return readonly_fields
+        return (*readonly_fields, *self.fixed_on_change)
+
+
+class CounterAdminMixin:
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            count_added(obj)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        count_removed(obj)
+
+    def delete_queryset(self, request, queryset):
+        objects = list(queryset)
+        super().delete_queryset(request, queryset)
+        for obj in objects:
+            count_removed(obj)
+
+
+class RelationAdminMixin:
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_user_relations(obj.user_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_user_relations(obj.user_id)
+
+    def delete_queryset(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for user_id in user_ids:
+            invalidate_user_relations(user_id)
+
+
+class CatalogAdminMixin:
+    catalogs = ()
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_catalog_version_on_commit(*self.catalogs)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_catalog_version_on_commit(*self.catalogs)
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_catalog_version_on_commit(*self.catalogs)
+
+
+class SimilarAdminMixin:
+    def delete_model(self, request, obj):
+        listing = listing_recipes([obj.id])
+        super().delete_model(request, obj)
+        rebuild_similar_recipes(listing)
+
+    def delete_queryset(self, request, queryset):
+        listing = listing_recipes(list(queryset.values_list('id', flat=True)))
+        super().delete_queryset(request, queryset)
+        rebuild_similar_recipes(listing)
+
+
+class IngredientPairAdminMixin:
+    def delete_model(self, request, obj):
+        ingredients = recipe_ingredient_ids(obj.id)
+        super().delete_model(request, obj)
+        change_ingredient_pairs(ingredients, [])
+
+    def delete_queryset(self, request, queryset):
+        ingredients = [recipe_ingredient_ids(recipe.id) for recipe in queryset]
+        super().delete_queryset(request, queryset)
+        for recipe_ingredients in ingredients:
+            change_ingredient_pairs(recipe_ingredients, [])
+
+
+class CardAdminMixin:
+    card_lookup = None
+
+    def card_recipe_ids(self, objects):
+        return list(Recipe.objects.filter(
+            **{f'{self.card_lookup}__in': objects}
+        ).values_list('id', flat=True).distinct())
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            refresh_recipe_cards(self.card_recipe_ids([obj]))
+
+    def delete_model(self, request, obj):
+        recipe_ids = self.card_recipe_ids([obj])
+        super().delete_model(request, obj)
+        refresh_recipe_cards(recipe_ids)
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = self.card_recipe_ids(queryset)
+        super().delete_queryset(request, queryset)
+        refresh_recipe_cards(recipe_ids)
+
+
+class ShoppingListAdminMixin:
+    cart_lookup = None
+
+    def cart_user_ids(self, objects):
+        return list(User.objects.filter(
+            **{f'shopping_cart__{self.cart_lookup}__in': objects}
+        ).values_list('id', flat=True).distinct())
+
+    def delete_model(self, request, obj):
+        user_ids = self.cart_user_ids([obj])
+        super().delete_model(request, obj)
+        rebuild_shopping_lists(User.objects.filter(id__in=user_ids))
+
+    def delete_queryset(self, request, queryset):
+        user_ids = self.cart_user_ids(queryset)
+        super().delete_queryset(request, queryset)
+        rebuild_shopping_lists(User.objects.filter(id__in=user_ids))
+
+
+class ChangedFieldsAdminMixin:
+    def save_model(self, request, obj, form, change):
+        if not change:
+            super().save_model(request, obj, form, change)
+            return
+        obj.save(update_fields=[*form.changed_data, 'updated_at'])
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(CounterAdminMixin, CatalogAdminMixin, SimilarAdminMixin,
+                  IngredientPairAdminMixin, ShoppingListAdminMixin,
+                  ChangedFieldsAdminMixin, FixedOnChangeAdminMixin,
+                  admin.ModelAdmin):
+    catalogs = ('recipes',)
+    cart_lookup = 'recipe'
+    fixed_on_change = ('author',)
     fields = ('author',
               'name',
               'image',
@@ -13,6 +167,12 @@ class RecipeAdmin(admin.ModelAdmin):
               )
     readonly_fields = (
         'pub_date',
+        'favorites_count',
+    )
+    list_display = (
+        'name',
+        'author',
+        'favorites_count',
     )
     list_filter = (
         'author',
@@ -20,9 +180,32 @@ class RecipeAdmin(admin.ModelAdmin):
     )
     empty_value_display = '-пусто-'
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            invalidate_recipe(obj.id)
+        else:
+            fan_out_recipe(obj)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        refresh_recipe_cards([form.instance.id])
+
+    def delete_model(self, request, obj):
+        invalidate_recipe(obj.id)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        invalidate_recipe(*queryset.values_list('id', flat=True))
+        super().delete_queryset(request, queryset)
+
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(CardAdminMixin, CatalogAdminMixin,
+                      ShoppingListAdminMixin, admin.ModelAdmin):
+    catalogs = ('ingredients', 'recipes')
+    card_lookup = 'ingredients'
+    cart_lookup = 'recipe__ingredients'
     fields = (
         'name',
         'measurement_unit'
@@ -32,9 +215,17 @@ class IngredientAdmin(admin.ModelAdmin):
     )
     empty_value_display = '-пусто-'
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            rebuild_shopping_lists(User.objects.filter(
+                shopping_cart__recipe__ingredients=obj))
+
 
 @admin.register(Tag)
-class TagAdmin(admin.ModelAdmin):
+class TagAdmin(CardAdminMixin, CatalogAdminMixin, admin.ModelAdmin):
+    catalogs = ('tags',)
+    card_lookup = 'tags'
     fields = (
         'name',
         'color',
@@ -44,7 +235,9 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(RelationAdminMixin, CounterAdminMixin,
+                    FixedOnChangeAdminMixin, admin.ModelAdmin):
+    fixed_on_change = ('user', 'recipe')
     list_display = (
         'id',
         'user',
@@ -54,10 +247,26 @@ class FavoriteAdmin(admin.ModelAdmin):
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(RelationAdminMixin, CounterAdminMixin,
+                        FixedOnChangeAdminMixin, admin.ModelAdmin):
+    fixed_on_change = ('user', 'recipe')
     list_display = (
         'id',
         'user',
         'recipe',
         'added_date'
     )
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            add_to_shopping_list(obj.user, obj.recipe)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        remove_from_shopping_list(obj.user, obj.recipe)
+
+    def delete_queryset(self, request, queryset):
+        user_ids = list(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        rebuild_shopping_lists(User.objects.filter(id__in=user_ids))
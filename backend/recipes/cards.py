@@ -0,0 +1,75 @@
+import json
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .models import Recipe, RecipeCard, RecipeIngredient
+from .recipe_cache import invalidate_recipe
+from .serializers import ShowRecipeSerializer
+
+CARD_BATCH_SIZE = 500
+
+
+def render_card(recipe):
+    return ShowRecipeSerializer(recipe).data
+
+
+def _card_recipes():
+    return Recipe.objects.select_related(
+        'author'
+    ).prefetch_related(
+        'tags',
+        Prefetch(
+            'recipeingredient_set',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        )
+    )
+
+
+def render_cards(recipe_ids):
+    return {
+        recipe.id: render_card(recipe)
+        for recipe in _card_recipes().filter(id__in=recipe_ids)
+    }
+
+
+def get_recipe_cards(recipe_ids):
+    cards = {
+        recipe_id: json.loads(data)
+        for recipe_id, data in RecipeCard.objects.filter(
+            recipe_id__in=recipe_ids).values_list('recipe_id', 'data')
+    }
+    missing = [recipe_id for recipe_id in recipe_ids
+               if recipe_id not in cards]
+    if missing:
+        cards.update(render_cards(missing))
+    return cards
+
+
+@transaction.atomic
+def refresh_recipe_cards(recipe_ids):
+    recipe_ids = sorted(set(recipe_ids))
+    for start in range(0, len(recipe_ids), CARD_BATCH_SIZE):
+        batch = recipe_ids[start:start + CARD_BATCH_SIZE]
+        recipes = _card_recipes().filter(
+            id__in=batch).select_for_update(of=('self',))
+        cards = [
+            RecipeCard(recipe_id=recipe.id,
+                       data=json.dumps(render_card(recipe),
+                                       ensure_ascii=False))
+            for recipe in recipes
+        ]
+        RecipeCard.objects.filter(recipe_id__in=batch).delete()
+        RecipeCard.objects.bulk_create(cards)
+    return len(recipe_ids)
+
+
+def refresh_author_cards(author_id):
+    recipe_ids = list(Recipe.objects.filter(
+        author_id=author_id).values_list('id', flat=True))
+    refresh_recipe_cards(recipe_ids)
+    invalidate_recipe(*recipe_ids)
+
+
+def build_recipe_cards():
+    return refresh_recipe_cards(Recipe.objects.values_list('id', flat=True))
@@ -0,0 +1,72 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from .models import Tag
+
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_catalog_version(catalog):
+    key = f'catalog:{catalog}:version'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time()), None)
+        return cache.get(key, int(time.time()))
+    return version
+
+
+def bump_catalog_version(*catalogs):
+    version = int(time.time())
+    for catalog in catalogs:
+        key = f'catalog:{catalog}:version'
+        cache.set(key, max(version, cache.get(key, 0) + 1), None)
+
+
+def bump_catalog_version_on_commit(*catalogs):
+    transaction.on_commit(lambda: bump_catalog_version(*catalogs))
+
+
+def get_tag_ids_by_slug():
+    key = f'catalog:tags:{get_catalog_version("tags")}:slugs'
+    slugs = cache.get(key)
+    if slugs is None:
+        slugs = {}
+        for tag_id, slug in Tag.objects.values_list('id', 'slug'):
+            slugs.setdefault(slug, []).append(tag_id)
+        cache.set(key, slugs, CATALOG_CACHE_TIMEOUT)
+    return slugs
+
+
+class CachedCatalogMixin:
+    catalog = None
+
+    def list(self, request, *args, **kwargs):
+        version = get_catalog_version(self.catalog)
+        query = hashlib.md5(
+            '&'.join(sorted(request.GET.urlencode().split('&'))).encode()
+        ).hexdigest()
+        etag = quote_etag(f'{self.catalog}-{version}-{query}')
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=version
+        )
+        if not_modified is not None:
+            return not_modified
+        key = f'catalog:{self.catalog}:{version}:{query}'
+        data = cache.get(key)
+        if data is None:
+            data = self.get_catalog_data(request, *args, **kwargs)
+            cache.set(key, data, CATALOG_CACHE_TIMEOUT)
+        response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(version)
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+    def get_catalog_data(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs).data
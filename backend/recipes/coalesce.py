@@ -0,0 +1,73 @@
+import math
+import random
+import time
+
+from django.core.cache import cache
+
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+EARLY_REFRESH_BETA = 1.0
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def _refresh_early(entry, now):
+    _, delta, expires = entry
+    return now - delta * EARLY_REFRESH_BETA * math.log(random.random()) >= (
+        expires
+    )
+
+
+def _compute(keys, items, compute_many, timeout):
+    started = time.time()
+    values = compute_many(items)
+    finished = time.time()
+    cache.set_many({
+        keys[item]: (value, finished - started, finished + timeout)
+        for item, value in values.items()
+    }, timeout)
+    return values
+
+
+def _wait(keys, waiting, values):
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while waiting and time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entries = cache.get_many([
+            key for item in waiting
+            for key in (keys[item], _lock_key(keys[item]))
+        ])
+        for item in waiting:
+            if keys[item] in entries:
+                values[item] = entries[keys[item]][0]
+        waiting = [item for item in waiting if item not in values
+                   and _lock_key(keys[item]) in entries]
+
+
+def get_many_coalesced(keys, compute_many, timeout):
+    entries = cache.get_many(list(keys.values()))
+    now = time.time()
+    values = {}
+    refresh = []
+    for item, key in keys.items():
+        entry = entries.get(key)
+        if entry is not None:
+            values[item] = entry[0]
+        if entry is None or _refresh_early(entry, now):
+            refresh.append(item)
+    owned = [item for item in refresh
+             if cache.add(_lock_key(keys[item]), 1, LOCK_TIMEOUT)]
+    if owned:
+        try:
+            values.update(_compute(keys, owned, compute_many, timeout))
+        finally:
+            cache.delete_many([_lock_key(keys[item]) for item in owned])
+    _wait(keys, [item for item in refresh
+                 if item not in values and item not in owned], values)
+    missing = [item for item in refresh
+               if item not in values and item not in owned]
+    if missing:
+        values.update(_compute(keys, missing, compute_many, timeout))
+    return values
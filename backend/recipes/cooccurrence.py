@@ -0,0 +1,127 @@
+from collections import Counter
+from itertools import permutations
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .models import IngredientPair, RecipeIngredient
+
+PAIRS_CACHE_TIMEOUT = 60 * 60
+PAIRS_PER_INGREDIENT = 50
+SUGGESTIONS_LIMIT = 10
+
+
+def _pairs_key(ingredient_id):
+    return f'ingredient_pairs:{ingredient_id}'
+
+
+def _upsert_pairs(deltas):
+    table = connection.ops.quote_name(IngredientPair._meta.db_table)
+    rows = sorted(deltas.items())
+    sql = (
+        f'INSERT INTO {table} (ingredient_id, other_id, count) '
+        f'VALUES {", ".join(["(%s, %s, %s)"] * len(rows))} '
+        f'ON CONFLICT (ingredient_id, other_id) '
+        f'DO UPDATE SET count = {table}.count + EXCLUDED.count'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [
+            value for (ingredient_id, other_id), delta in rows
+            for value in (ingredient_id, other_id, delta)
+        ])
+
+
+def _merge_pairs(deltas):
+    touched = {ingredient_id for ingredient_id, _ in deltas}
+    pairs = {
+        (pair.ingredient_id, pair.other_id): pair
+        for pair in IngredientPair.objects.select_for_update().filter(
+            ingredient_id__in=touched, other_id__in=touched)
+    }
+    created = []
+    for (ingredient_id, other_id), delta in deltas.items():
+        if (ingredient_id, other_id) in pairs:
+            pairs[(ingredient_id, other_id)].count += delta
+        else:
+            created.append(IngredientPair(
+                ingredient_id=ingredient_id, other_id=other_id, count=delta
+            ))
+    IngredientPair.objects.bulk_update(pairs.values(), ['count'])
+    IngredientPair.objects.bulk_create(created)
+
+
+@transaction.atomic
+def change_ingredient_pairs(old_ingredients, new_ingredients):
+    deltas = Counter(permutations(set(new_ingredients), 2))
+    deltas.subtract(permutations(set(old_ingredients), 2))
+    deltas = {pair: delta for pair, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    if connection.vendor == 'postgresql':
+        _upsert_pairs(deltas)
+    else:
+        _merge_pairs(deltas)
+    touched = {ingredient_id for ingredient_id, _ in deltas}
+    IngredientPair.objects.filter(
+        ingredient_id__in=touched, count__lte=0).delete()
+    transaction.on_commit(lambda: cache.delete_many(
+        [_pairs_key(ingredient_id) for ingredient_id in touched]
+    ))
+
+
+def recipe_ingredient_ids(recipe_id):
+    return list(RecipeIngredient.objects.filter(
+        recipe_id=recipe_id).values_list('ingredient_id', flat=True))
+
+
+def get_ingredient_pairs(ingredient_ids):
+    keys = {_pairs_key(ingredient_id): ingredient_id
+            for ingredient_id in ingredient_ids}
+    pairs = {keys[key]: value
+             for key, value in cache.get_many(list(keys)).items()}
+    missing = {}
+    for ingredient_id in set(ingredient_ids) - set(pairs):
+        missing[_pairs_key(ingredient_id)] = pairs[ingredient_id] = list(
+            IngredientPair.objects.filter(
+                ingredient_id=ingredient_id
+            ).values_list('other_id', 'count')[:PAIRS_PER_INGREDIENT]
+        )
+    cache.set_many(missing, PAIRS_CACHE_TIMEOUT)
+    return pairs
+
+
+def suggest_ingredients(ingredients, limit=SUGGESTIONS_LIMIT):
+    chosen = set(ingredients)
+    scores = Counter()
+    for pairs in get_ingredient_pairs(chosen).values():
+        for other_id, count in pairs:
+            if other_id not in chosen:
+                scores[other_id] += count
+    return [other_id for other_id, _ in scores.most_common(limit)]
+
+
+def build_ingredient_pairs(get_model=apps.get_model):
+    recipes = {}
+    for recipe_id, ingredient_id in get_model(
+            'recipes.RecipeIngredient').objects.values_list(
+            'recipe_id', 'ingredient_id').iterator():
+        recipes.setdefault(recipe_id, set()).add(ingredient_id)
+    counts = Counter(
+        pair for ingredients in recipes.values()
+        for pair in permutations(ingredients, 2)
+    )
+    ingredient_pair = get_model('recipes.IngredientPair')
+    with transaction.atomic():
+        ingredient_pair.objects.all().delete()
+        ingredient_pair.objects.bulk_create(
+            (ingredient_pair(ingredient_id=ingredient_id, other_id=other_id,
+                             count=count)
+             for (ingredient_id, other_id), count in counts.items()),
+            batch_size=1000
+        )
+    cache.delete_many([
+        _pairs_key(ingredient_id) for ingredient_id in get_model(
+            'recipes.Ingredient').objects.values_list('id', flat=True)
+    ])
+    return len(counts)
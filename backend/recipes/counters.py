@@ -0,0 +1,44 @@
+from django.apps import apps
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = {
+    'recipes.Favorite': ('recipe', 'recipes.Recipe', 'favorites_count'),
+    'recipes.ShoppingCart': ('recipe', 'recipes.Recipe',
+                             'shopping_cart_count'),
+    'recipes.Follow': ('author', 'users.User', 'followers_count'),
+    'recipes.Recipe': ('author', 'users.User', 'recipes_count'),
+}
+
+
+def change_counter(model, target_id, delta):
+    _, target_label, field = COUNTERS[model._meta.label]
+    targets = apps.get_model(target_label).objects.filter(pk=target_id)
+    if delta < 0:
+        targets = targets.filter(**{f'{field}__gte': -delta})
+    targets.update(**{field: F(field) + delta})
+
+
+def count_added(obj):
+    fk = COUNTERS[obj._meta.label][0]
+    change_counter(type(obj), getattr(obj, f'{fk}_id'), 1)
+
+
+def count_removed(obj):
+    fk = COUNTERS[obj._meta.label][0]
+    change_counter(type(obj), getattr(obj, f'{fk}_id'), -1)
+
+
+def recount_counters(get_model=apps.get_model):
+    fixed = {}
+    for source_label, (fk, target_label, field) in COUNTERS.items():
+        source = get_model(source_label)
+        actual = Coalesce(Subquery(
+            source.objects.filter(**{fk: OuterRef('pk')}).order_by().values(
+                fk
+            ).annotate(total=Count('pk')).values('total')
+        ), 0)
+        fixed[field] = get_model(target_label).objects.annotate(
+            actual=actual
+        ).exclude(**{field: F('actual')}).update(**{field: actual})
+    return fixed
@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import FeedEntry, Follow, Recipe
+
+FEED_FANOUT_LIMIT = 10000
+FEED_BACKFILL = 100
+FEED_SYNC_LAG = timedelta(minutes=1)
+FEED_SYNC_INTERVAL = timedelta(minutes=1)
+FEED_BATCH_SIZE = 1000
+
+
+def fan_out_recipe(recipe):
+    if recipe.author.followers_count > FEED_FANOUT_LIMIT:
+        return
+    followers = Follow.objects.filter(
+        author_id=recipe.author_id).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, recipe=recipe,
+                   author_id=recipe.author_id, pub_date=recipe.pub_date)
+         for user_id in followers.iterator()),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+@transaction.atomic
+def backfill_feed(user, author_id, since=None):
+    now = timezone.now()
+    recipes = Recipe.objects.filter(author_id=author_id)
+    if since is not None:
+        recipes = recipes.filter(pub_date__gt=since - FEED_SYNC_LAG)
+    recipes = recipes.order_by('-pub_date', '-id').values_list(
+        'id', 'pub_date')
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user=user, recipe_id=recipe_id, author_id=author_id,
+                   pub_date=pub_date)
+         for recipe_id, pub_date in recipes[:FEED_BACKFILL]],
+        ignore_conflicts=True
+    )
+    Follow.objects.filter(user=user, author_id=author_id).update(
+        feed_synced_at=now)
+
+
+def sync_feed(user):
+    stale = timezone.now() - FEED_SYNC_INTERVAL
+    for author_id, synced_at in Follow.objects.filter(
+            Q(feed_synced_at__isnull=True) | Q(feed_synced_at__lt=stale),
+            user=user,
+            author__followers_count__gt=FEED_FANOUT_LIMIT
+    ).values_list('author_id', 'feed_synced_at'):
+        backfill_feed(user, author_id, synced_at)
+
+
+def clear_feed(user, author_id):
+    FeedEntry.objects.filter(user=user, author_id=author_id).delete()
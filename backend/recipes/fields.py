@@ -3,8 +3,10 @@ import imghdr
 import uuid
 
 import six
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.files.base import ContentFile
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
 
 
 class Base64ImageField(serializers.ImageField):
@@ -28,3 +30,64 @@ class Base64ImageField(serializers.ImageField):
     def get_file_extension(self, file_name, decoded_file):
         extension = imghdr.what(file_name, decoded_file)
         return 'jpg' if extension == 'jpeg' else extension
+
+
+class BatchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Checks only the pk type; objects of the whole list are fetched with
+    one IN query by BatchedManyRelatedField or BatchedListSerializer.
+    """
+    default_error_messages = {
+        'does_not_exist_many': 'Недопустимые первичные ключи {pk_values} - '
+                               'объекты не существуют.',
+    }
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchedManyRelatedField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (DjangoValidationError, TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def resolve(self, pks):
+        objects = self.get_queryset().in_bulk(set(pks))
+        missing = list(dict.fromkeys(pk for pk in pks if pk not in objects))
+        if missing:
+            self.fail('does_not_exist_many',
+                      pk_values=', '.join(str(pk) for pk in missing))
+        return [objects[pk] for pk in pks]
+
+
+class BatchedManyRelatedField(ManyRelatedField):
+    def to_internal_value(self, data):
+        pks = super().to_internal_value(data)
+        return self.child_relation.resolve(pks)
+
+
+class BatchedListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        for field in self.child._writable_fields:
+            if not isinstance(field, BatchedPrimaryKeyRelatedField):
+                continue
+            rows = [item for item in items if field.source in item]
+            try:
+                objects = field.resolve([row[field.source] for row in rows])
+            except serializers.ValidationError as exc:
+                raise serializers.ValidationError(
+                    {field.field_name: exc.detail}
+                )
+            for row, obj in zip(rows, objects):
+                row[field.source] = obj
+        return items
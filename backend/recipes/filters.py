@@ -1,11 +1,25 @@
+from django.db.models import Exists, F, OuterRef
 from django_filters import rest_framework as filters
 
-from .models import Recipe, Ingredient
+from .catalog import get_tag_ids_by_slug
+from .models import (Recipe, Ingredient, ReceiptTag, Favorite,
+                     ShoppingCart)
+from .search import search_recipes
+
+RECIPE_ORDERINGS = {
+    'popular': ('-favorites_count', '-shopping_cart_count', '-pub_date',
+                '-id'),
+    'trending': (F('trending__score').desc(nulls_last=True), '-pub_date',
+                 '-id'),
+}
 
 
 class RecipeFilter(filters.FilterSet):
-    tags = filters.AllValuesMultipleFilter(
-        field_name='receipttag__tag__slug'
+    tags = filters.MultipleChoiceFilter(
+        method='get_tags'
+    )
+    author = filters.NumberFilter(
+        field_name='author_id'
     )
     is_favorited = filters.BooleanFilter(
         method='get_favorite'
@@ -13,6 +27,16 @@ class RecipeFilter(filters.FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_in_shopping_cart'
     )
+    search = filters.CharFilter(
+        method='get_search'
+    )
+    ordering = filters.ChoiceFilter(
+        choices=(
+            ('popular', 'Популярные'),
+            ('trending', 'Популярные за неделю'),
+        ),
+        method='get_ordering'
+    )
 
     class Meta:
         model = Recipe
@@ -20,22 +44,45 @@ class RecipeFilter(filters.FilterSet):
             'is_favorited',
             'is_in_shopping_cart',
             'author',
-            'tags'
+            'tags',
+            'search',
+            'ordering'
         )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tag_ids = get_tag_ids_by_slug()
+        self.filters['tags'].extra['choices'] = [
+            (slug, slug) for slug in self.tag_ids
+        ]
+
+    def get_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        tag_ids = [tag_id for slug in value for tag_id in self.tag_ids[slug]]
+        return queryset.filter(Exists(ReceiptTag.objects.filter(
+            recipe=OuterRef('pk'), tag_id__in=tag_ids
+        )))
+
     def get_favorite(self, queryset, name, value):
-        if value:
-            return Recipe.objects.filter(
-                favorites__user=self.request.user
-            )
-        return Recipe.objects.all()
+        if value and self.request.user.is_authenticated:
+            return queryset.filter(Exists(Favorite.objects.filter(
+                user=self.request.user, recipe=OuterRef('pk')
+            )))
+        return queryset
 
     def get_in_shopping_cart(self, queryset, name, value):
-        if value:
-            return Recipe.objects.filter(
-                shopping_cart__user=self.request.user
-            )
-        return Recipe.objects.all()
+        if value and self.request.user.is_authenticated:
+            return queryset.filter(Exists(ShoppingCart.objects.filter(
+                user=self.request.user, recipe=OuterRef('pk')
+            )))
+        return queryset
+
+    def get_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def get_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
 
 
 class IngredientFilter(filters.FilterSet):
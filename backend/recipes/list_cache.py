@@ -0,0 +1,42 @@
+import hashlib
+
+from django.conf import settings
+
+from .catalog import get_catalog_version
+from .coalesce import get_many_coalesced
+
+LIST_CACHE_TIMEOUT = 60 * 5
+LIST_CACHE_PARAMS = ('tags', 'author', 'search', 'ordering',
+                     'page', 'limit', 'cursor')
+PERSONAL_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def _normalise(params, name):
+    if name == 'tags':
+        return ','.join(sorted(set(filter(None, params.getlist(name)))))
+    value = params.get(name, '').strip()
+    if name == 'search':
+        return ' '.join(value.split()).casefold()
+    if name == 'page':
+        return value or '1'
+    return value
+
+
+def get_list_cache_key(params):
+    if not settings.RECIPE_LIST_CACHE or any(
+            name in params for name in PERSONAL_PARAMS):
+        return None
+    mode = 'cursor' if 'cursor' in params else 'page'
+    query = '&'.join([mode, *(
+        f'{name}={_normalise(params, name)}' for name in LIST_CACHE_PARAMS
+    )])
+    return 'recipes:list:{}:{}'.format(
+        get_catalog_version('recipes'),
+        hashlib.md5(query.encode()).hexdigest()
+    )
+
+
+def get_cached_page(key, compute):
+    return get_many_coalesced(
+        {key: key}, lambda keys: {key: compute()}, LIST_CACHE_TIMEOUT
+    )[key]
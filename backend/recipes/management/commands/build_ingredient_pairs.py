@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from recipes.cooccurrence import build_ingredient_pairs
+
+
+class Command(BaseCommand):
+    help = 'Полный пересчёт таблицы сочетаний ингредиентов'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Сохранено пар: {build_ingredient_pairs()}')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from recipes.cards import build_recipe_cards
+
+
+class Command(BaseCommand):
+    help = 'Полный пересчёт карточек рецептов для списка'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Обновлено карточек: {build_recipe_cards()}')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import build_similar_recipes
+
+
+class Command(BaseCommand):
+    help = 'Полный пересчёт таблицы похожих рецептов'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Сохранено пар: {build_similar_recipes()}')
@@ -0,0 +1,138 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from recipes.filters import RecipeFilter
+from recipes.models import (Favorite, FeedEntry, Follow, IngredientPair,
+                            Recipe, ReceiptTag, RecipeIngredient,
+                            ShoppingCart, SimilarRecipe, Tag)
+
+User = get_user_model()
+
+BIG_TABLES = {
+    model._meta.db_table
+    for model in (Recipe, RecipeIngredient, ReceiptTag, Follow, Favorite,
+                  ShoppingCart)
+}
+SEQ_SCAN = re.compile(r'Seq Scan on (\w+)')
+# Bitmap scans stay enabled: the GIN search index is only used through them.
+PLANNER_SETTINGS = ('enable_seqscan', 'enable_sort')
+HOT_QUERY_INDEXES = {
+    'recipes_latest': 'recipe_pub_date_id_idx',
+    'recipes_by_author': 'recipe_author_pub_date_idx',
+    'recipes_popular': 'recipe_popular_idx',
+    'followers': 'follow_author_user_idx',
+    'favorites_by_user': 'favorite_user_added_idx',
+    'cart_by_user': 'shoppingcart_user_added_idx',
+    'recipes_by_tag': 'receipttag_tag_recipe_idx',
+    'feed': 'feed_user_pub_date_idx',
+    'similar_recipes': 'similar_recipe_score_idx',
+    'ingredient_pairs': 'ingredient_pair_count_idx',
+}
+
+
+def _first_id(model):
+    return model.objects.order_by('id').values_list(
+        'id', flat=True).first() or 1
+
+
+def _filtered_recipes(user, **params):
+    request = RequestFactory().get('/api/recipes/', params)
+    request.user = user
+    queryset = RecipeFilter(
+        request.GET, queryset=Recipe.objects.all(), request=request
+    ).qs
+    if not queryset.query.order_by:
+        queryset = queryset.order_by('-pub_date', '-id')
+    return queryset[:6]
+
+
+def hot_queries():
+    user = User(id=_first_id(User))
+    tag = Tag.objects.order_by('id').first()
+    recipe_id = _first_id(Recipe)
+    tag_params = {'tags': [tag.slug]} if tag else {}
+    return {
+        'recipes_latest': _filtered_recipes(user),
+        'recipes_by_author': _filtered_recipes(user, author=user.id),
+        'recipes_popular': _filtered_recipes(user, ordering='popular'),
+        'recipes_by_tags': _filtered_recipes(user, **tag_params),
+        'recipes_favorited': _filtered_recipes(user, is_favorited=1),
+        'recipes_in_cart': _filtered_recipes(user, is_in_shopping_cart=1),
+        'recipes_search': _filtered_recipes(user, search='суп'),
+        'recipe_ingredients': RecipeIngredient.objects.filter(
+            recipe_id__in=[recipe_id]),
+        'latest_by_author': Recipe.objects.latest_by_author([user.id], 3),
+        'subscriptions': User.objects.filter(
+            following__user=user).order_by('username')[:6],
+        'followers': Follow.objects.filter(author=user).values('user_id'),
+        'favorites_by_user': Favorite.objects.filter(
+            user=user).order_by('-added_date'),
+        'cart_by_user': ShoppingCart.objects.filter(
+            user=user).order_by('-added_date'),
+        'recipes_by_tag': ReceiptTag.objects.filter(
+            tag_id=tag.id if tag else 1).values('recipe_id'),
+        'feed': FeedEntry.objects.filter(user=user).order_by(
+            '-pub_date', '-recipe_id')[:6],
+        'similar_recipes': SimilarRecipe.objects.filter(
+            recipe_id=recipe_id).order_by('-score'),
+        'ingredient_pairs': IngredientPair.objects.filter(
+            ingredient_id=_first_id(IngredientPair)).order_by('-count')[:10],
+    }
+
+
+def check_plan(name, plan):
+    problems = [f'Seq Scan on {table}' for table in sorted(
+        BIG_TABLES.intersection(SEQ_SCAN.findall(plan)))]
+    index = HOT_QUERY_INDEXES.get(name)
+    if index and index not in plan:
+        problems.append(f'не используется {index}')
+    return problems
+
+
+def explain(queryset):
+    if hasattr(queryset, 'raw_query'):
+        sql, params = queryset.raw_query, queryset.params
+    else:
+        sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+        cursor.execute(f'EXPLAIN {sql}', params)
+        return '\n'.join(row[0] for row in cursor.fetchall())
+
+
+def force_index_scans():
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for setting in PLANNER_SETTINGS:
+                cursor.execute(f'SET LOCAL {setting} = off')
+
+
+class Command(BaseCommand):
+    help = ('Проверка планов горячих запросов: ошибка, если по большим '
+            'таблицам выполняется последовательное сканирование или '
+            'не используется ожидаемый индекс')
+
+    def handle(self, *args, **options):
+        failed = []
+        with transaction.atomic():
+            force_index_scans()
+            for name, queryset in hot_queries().items():
+                plan = explain(queryset)
+                problems = check_plan(name, plan)
+                if problems:
+                    failed.append(name)
+                    self.stdout.write(f'{name}: {"; ".join(problems)}')
+                else:
+                    self.stdout.write(f'{name}: ok')
+                if options['verbosity'] > 1:
+                    self.stdout.write(plan)
+        if failed:
+            raise CommandError(
+                f'Неудачные планы запросов: {", ".join(failed)}'
+            )
@@ -0,0 +1,35 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.catalog import bump_catalog_version
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = 'Загрузка ингредиентов из json-файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(
+                settings.BASE_DIR, '..', 'data', 'ingredients.json'
+            )
+        )
+
+    def handle(self, *args, **options):
+        with open(options['path'], encoding='utf-8') as file:
+            data = json.load(file)
+        existing = set(Ingredient.objects.values_list(
+            'name', 'measurement_unit'))
+        created = Ingredient.objects.bulk_create(
+            Ingredient(name=item['name'],
+                       measurement_unit=item['measurement_unit'])
+            for item in data
+            if (item['name'], item['measurement_unit']) not in existing
+        )
+        if created:
+            bump_catalog_version('ingredients')
+        self.stdout.write(f'Загружено ингредиентов: {len(created)}')
@@ -0,0 +1,15 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from recipes.shopping_list import rebuild_shopping_lists
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт списков покупок всех пользователей'
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        rebuild_shopping_lists(users)
+        self.stdout.write(f'Пересчитано списков: {users.count()}')
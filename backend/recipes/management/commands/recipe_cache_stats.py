@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipes.recipe_cache import get_recipe_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Счётчики попаданий и промахов кэша рецептов'
+
+    def handle(self, *args, **options):
+        for stat, value in get_recipe_cache_stats().items():
+            self.stdout.write(f'{stat}: {value}')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipes.counters import recount_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт счётчиков избранного, корзины, рецептов и подписчиков'
+
+    def handle(self, *args, **options):
+        for field, fixed in recount_counters().items():
+            self.stdout.write(f'{field}: исправлено {fixed}')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from recipes.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = 'Инкрементальный пересчёт популярности рецептов'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Обновлено рецептов: {refresh_trending()}')
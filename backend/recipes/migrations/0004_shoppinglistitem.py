@@ -0,0 +1,69 @@
+# Generated by Django 3.2.6 on 2026-10-18 06:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Frozen copy of recipes.units.BASE_UNITS.
+BASE_UNITS = {
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+}
+
+
+def fill_shopping_lists(apps, schema_editor):
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    rows = ShoppingCart.objects.filter(
+        recipe__recipeingredient__isnull=False
+    ).values_list(
+        'user_id',
+        'recipe__recipeingredient__ingredient__name',
+        'recipe__recipeingredient__ingredient__measurement_unit',
+        'recipe__recipeingredient__amount',
+    )
+    totals = {}
+    for user_id, name, measurement_unit, amount in rows.iterator():
+        measurement_unit, factor = BASE_UNITS.get(
+            measurement_unit, (measurement_unit, 1)
+        )
+        key = (user_id, name, measurement_unit)
+        totals[key] = totals.get(key, 0) + amount * factor
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(user_id=user_id, name=name,
+                         measurement_unit=measurement_unit, amount=amount)
+        for (user_id, name, measurement_unit), amount in totals.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0003_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название ингредиента')),
+                ('measurement_unit', models.CharField(max_length=100, verbose_name='Единицы измерения')),
+                ('amount', models.PositiveIntegerField(verbose_name='Количество')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Список покупок',
+                'verbose_name_plural': 'Список покупок',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'name', 'measurement_unit'), name='unique_shopping_list_item'),
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 3.2.6 on 2026-10-18 06:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# Frozen copy of recipes.counters.COUNTERS.
+COUNTERS = {
+    'recipes.Favorite': ('recipe', 'recipes.Recipe', 'favorites_count'),
+    'recipes.ShoppingCart': ('recipe', 'recipes.Recipe',
+                             'shopping_cart_count'),
+    'recipes.Follow': ('author', 'users.User', 'followers_count'),
+    'recipes.Recipe': ('author', 'users.User', 'recipes_count'),
+}
+
+
+def fill_counters(apps, schema_editor):
+    for source_label, (fk, target_label, field) in COUNTERS.items():
+        source = apps.get_model(source_label)
+        actual = Coalesce(Subquery(
+            source.objects.filter(**{fk: OuterRef('pk')}).order_by().values(
+                fk
+            ).annotate(total=Count('pk')).values('total')
+        ), 0)
+        apps.get_model(target_label).objects.update(**{field: actual})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_shoppinglistitem'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
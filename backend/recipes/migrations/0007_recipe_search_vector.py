@@ -0,0 +1,37 @@
+from django.db import migrations
+
+ADD_SEARCH_VECTOR = """
+ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian'::regconfig,
+                              coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('russian'::regconfig,
+                              coalesce(text, '')), 'B')
+    ) STORED;
+CREATE INDEX recipe_search_vector_idx ON recipes_recipe
+    USING gin (search_vector);
+"""
+DROP_SEARCH_VECTOR = """
+ALTER TABLE recipes_recipe DROP COLUMN search_vector;
+"""
+
+
+def run_on_postgresql(sql):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgresql(ADD_SEARCH_VECTOR),
+            run_on_postgresql(DROP_SEARCH_VECTOR)
+        ),
+    ]
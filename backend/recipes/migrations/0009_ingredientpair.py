@@ -0,0 +1,36 @@
+# Generated by Django 3.2.6 on 2026-10-18 06:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_similarrecipe'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0, verbose_name='Рецептов вместе')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pairs', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.ingredient', verbose_name='Сочетается с')),
+            ],
+            options={
+                'verbose_name': 'Сочетание ингредиентов',
+                'verbose_name_plural': 'Сочетания ингредиентов',
+                'ordering': ['-count'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ingredientpair',
+            index=models.Index(fields=['ingredient', '-count'], name='ingredient_pair_count_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredientpair',
+            constraint=models.UniqueConstraint(fields=('ingredient', 'other'), name='unique_ingredient_pair'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 3.2.6 on 2026-10-18 06:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+# Frozen copy of recipes.feed.FEED_BACKFILL.
+FEED_BACKFILL = 100
+
+
+def fill_feed(apps, schema_editor):
+    Follow = apps.get_model('recipes', 'Follow')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    now = timezone.now()
+    for user_id, author_id in Follow.objects.values_list(
+            'user_id', 'author_id').iterator():
+        recipes = Recipe.objects.filter(author_id=author_id).order_by(
+            '-pub_date', '-id').values_list('id', 'pub_date')
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                       author_id=author_id, pub_date=pub_date)
+             for recipe_id, pub_date in recipes[:FEED_BACKFILL]],
+            ignore_conflicts=True
+        )
+    Follow.objects.update(feed_synced_at=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0010_recipescore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='follow',
+            name='feed_synced_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Лента синхронизирована'),
+        ),
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Лента подписок',
+                'ordering': ['-pub_date', '-recipe_id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_user_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'author'], name='feed_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.6 on 2026-10-18 06:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeCard',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('data', models.TextField(verbose_name='Карточка')),
+            ],
+            options={
+                'verbose_name': 'Карточка рецепта',
+                'verbose_name_plural': 'Карточки рецептов',
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.6 on 2026-10-18 06:45
+
+import datetime
+from django.db import migrations, models
+from django.utils.timezone import utc
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_drop_redundant_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipescore',
+            name='epoch',
+            field=models.DateTimeField(default=datetime.datetime(2021, 1, 1, 0, 0, tzinfo=utc), verbose_name='Точка отсчёта'),
+            preserve_default=False,
+        ),
+    ]
@@ -1,5 +1,7 @@
 from colorfield.fields import ColorField
 from django.db import models
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -36,8 +38,37 @@ class Ingredient(models.Model):
         return f'{self.name} {self.measurement_unit}'
 
 
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
+
+    def latest_by_author(self, author_ids, limit):
+        ranked = self.filter(author_id__in=author_ids).only(
+            'id', 'author_id', 'name', 'image', 'cooking_time', 'pub_date'
+        ).annotate(
+            author_rank=Window(
+                RowNumber(),
+                partition_by=[F('author_id')],
+                order_by=[F('pub_date').desc(), F('id').desc()]
+            )
+        ).order_by()
+        sql, params = ranked.query.sql_with_params()
+        return self.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE author_rank <= %s '
+            f'ORDER BY author_id, author_rank',
+            [*params, limit]
+        )
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               db_index=False,
                                related_name='recipes', verbose_name='Автор',
                                help_text='Выбор из существующих пользователей')
     name = models.CharField(verbose_name='Название',
@@ -63,13 +94,35 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(verbose_name='Дата публикации',
                                     auto_now_add=True,
                                     help_text='Автоматически заполняется '
-                                              'сегодняшней датой',
-                                    db_index=True)
+                                              'сегодняшней датой')
+    updated_at = models.DateTimeField(verbose_name='Дата изменения',
+                                      auto_now=True)
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='В списках покупок',
+        default=0,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='recipe_pub_date_id_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='recipe_author_pub_date_idx'),
+            models.Index(fields=['-favorites_count', '-shopping_cart_count',
+                                 '-pub_date', '-id'],
+                         name='recipe_popular_idx'),
+        ]
 
     def __str__(self):
         return f'{self.author}: {self.name}'
@@ -104,6 +157,7 @@ class ReceiptTag(models.Model):
     tag = models.ForeignKey(
         Tag,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='Тег'
     )
 
@@ -116,6 +170,10 @@ class ReceiptTag(models.Model):
                 name='unique_tagging'
             )
         ]
+        indexes = [
+            models.Index(fields=['tag', 'recipe'],
+                         name='receipttag_tag_recipe_idx'),
+        ]
 
 
 class Follow(models.Model):
@@ -127,6 +185,7 @@ class Follow(models.Model):
     author = models.ForeignKey(
         User, verbose_name='Автор',
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='following'
     )
 
@@ -134,6 +193,12 @@ class Follow(models.Model):
         auto_now_add=True,
         verbose_name='Дата создания'
     )
+    feed_synced_at = models.DateTimeField(
+        verbose_name='Лента синхронизирована',
+        null=True,
+        blank=True,
+        editable=False
+    )
 
     class Meta:
         ordering = ['-created_at']
@@ -145,6 +210,10 @@ class Follow(models.Model):
                 name='unique_follow'
             )
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user} following {self.author}'
@@ -154,6 +223,7 @@ class Favorite(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='Пользователь',
         related_name='favorites',
     )
@@ -177,6 +247,10 @@ class Favorite(models.Model):
                 name='unique_favorite'
             )
         ]
+        indexes = [
+            models.Index(fields=['user', '-added_date'],
+                         name='favorite_user_added_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user} added {self.recipe}'
@@ -186,6 +260,7 @@ class ShoppingCart(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='shopping_cart',
         verbose_name='Пользователь'
     )
@@ -208,6 +283,215 @@ class ShoppingCart(models.Model):
                 fields=['user', 'recipe'],
                 name='unique_shopping_cart'
             )]
+        indexes = [
+            models.Index(fields=['user', '-added_date'],
+                         name='shoppingcart_user_added_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user} added {self.recipe}'
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    name = models.CharField(
+        verbose_name='Название ингредиента',
+        max_length=100
+    )
+    measurement_unit = models.CharField(
+        verbose_name='Единицы измерения',
+        max_length=100
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество'
+    )
+
+    class Meta:
+        ordering = ['name', ]
+        verbose_name = 'Список покупок'
+        verbose_name_plural = verbose_name
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name', 'measurement_unit'],
+                name='unique_shopping_list_item'
+            )]
+
+    def __str__(self):
+        return (f'{self.user}: {self.name} {self.amount} '
+                f'{self.measurement_unit}')
+
+
+class SimilarRecipe(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='similar',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='+',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='Сходство'
+    )
+
+    class Meta:
+        ordering = ['-score', ]
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe'
+            )]
+        indexes = [
+            models.Index(fields=['recipe', '-score'],
+                         name='similar_recipe_score_idx'),
+            models.Index(fields=['similar', 'recipe'],
+                         name='similar_similar_recipe_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} ~ {self.similar}'
+
+
+class IngredientPair(models.Model):
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='pairs',
+        verbose_name='Ингредиент'
+    )
+    other = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Сочетается с'
+    )
+    count = models.IntegerField(
+        verbose_name='Рецептов вместе',
+        default=0
+    )
+
+    class Meta:
+        ordering = ['-count', ]
+        verbose_name = 'Сочетание ингредиентов'
+        verbose_name_plural = 'Сочетания ингредиентов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['ingredient', 'other'],
+                name='unique_ingredient_pair'
+            )]
+        indexes = [
+            models.Index(fields=['ingredient', '-count'],
+                         name='ingredient_pair_count_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient} + {self.other}: {self.count}'
+
+
+class RecipeScore(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='Популярность',
+        default=0
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата пересчёта'
+    )
+    epoch = models.DateTimeField(
+        verbose_name='Точка отсчёта'
+    )
+
+    class Meta:
+        ordering = ['-score', ]
+        verbose_name = 'Популярность рецепта'
+        verbose_name_plural = 'Популярность рецептов'
+        indexes = [
+            models.Index(fields=['-score'], name='recipe_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe}: {self.score}'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='feed',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        ordering = ['-pub_date', '-recipe_id']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-recipe'],
+                         name='feed_user_pub_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='feed_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.recipe}'
+
+
+class RecipeCard(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='card',
+        verbose_name='Рецепт'
+    )
+    data = models.TextField(
+        verbose_name='Карточка'
+    )
+
+    class Meta:
+        verbose_name = 'Карточка рецепта'
+        verbose_name_plural = 'Карточки рецептов'
+
+    def __str__(self):
+        return f'{self.recipe}'
@@ -1,5 +1,147 @@
+import base64
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class PkCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return self.object_list.values('pk').count()
+
+
+class ListPageNumberPaginator(PageNumberPagination):
+    page_size_query_param = 'limit'
 
 
 class CustomPageNumberPaginator(PageNumberPagination):
+    django_paginator_class = PkCountPaginator
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    keyset_fields = ('pub_date', 'id')
+    keyset_only = False
+    invalid_cursor_message = 'Неверный курсор'
+    cursor_ordering_message = ('Курсор нельзя сочетать с сортировкой '
+                               'и поиском')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = (self.keyset_only
+                       or self.cursor_query_param in request.query_params)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        if queryset.query.order_by:
+            raise serializers.ValidationError(
+                {self.cursor_query_param: [self.cursor_ordering_message]}
+            )
+        self.request = request
+        page_size = self.get_page_size(request)
+        reverse, position = self.decode_cursor(
+            queryset.model,
+            request.query_params.get(self.cursor_query_param, '')
+        )
+        ordering = [f'-{field}' for field in self.keyset_fields]
+        if reverse:
+            ordering = list(self.keyset_fields)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(position, reverse))
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+        has_next = has_more if not reverse else True
+        has_previous = has_more if reverse else position is not None
+        self.next_cursor = (
+            self.encode_cursor(results[-1], False)
+            if results and has_next else None
+        )
+        self.previous_cursor = (
+            self.encode_cursor(results[0], True)
+            if results and has_previous else None
+        )
+        return results
+
+    def keyset_filter(self, position, reverse):
+        lookup = 'gt' if reverse else 'lt'
+        condition = Q()
+        for index, field in enumerate(self.keyset_fields):
+            condition |= Q(**{
+                **dict(zip(self.keyset_fields[:index], position[:index])),
+                f'{field}__{lookup}': position[index],
+            })
+        return condition
+
+    def encode_cursor(self, instance, reverse):
+        values = [str(getattr(instance, field))
+                  for field in self.keyset_fields]
+        token = '|'.join(['r' if reverse else 'n', *values])
+        return base64.urlsafe_b64encode(token.encode()).decode()
+
+    def decode_cursor(self, model, cursor):
+        if not cursor:
+            return False, None
+        try:
+            direction, *values = base64.urlsafe_b64decode(
+                cursor.encode()
+            ).decode().split('|')
+            if direction not in ('n', 'r') or (
+                    len(values) != len(self.keyset_fields)):
+                raise ValueError
+            position = [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.keyset_fields, values)
+            ]
+        except (ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return direction == 'r', position
+
+    def get_cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            cursor
+        )
+
+    def get_page_state(self):
+        if self.keyset:
+            return {'keyset': True, 'next': self.next_cursor,
+                    'previous': self.previous_cursor}
+        return {'keyset': False, 'count': self.page.paginator.count,
+                'number': self.page.number,
+                'page_size': self.page.paginator.per_page}
+
+    def restore_page_state(self, request, state):
+        self.request = request
+        self.keyset = state['keyset']
+        if self.keyset:
+            self.next_cursor = state['next']
+            self.previous_cursor = state['previous']
+            return
+        paginator = self.django_paginator_class([], state['page_size'])
+        paginator.count = state['count']
+        self.page = Page([], state['number'], paginator)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_cursor_link(self.next_cursor)),
+            ('previous', self.get_cursor_link(self.previous_cursor)),
+            ('results', data)
+        ]))
+
+
+class FeedPaginator(CustomPageNumberPaginator):
+    keyset_fields = ('pub_date', 'recipe_id')
+    keyset_only = True
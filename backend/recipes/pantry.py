@@ -0,0 +1,86 @@
+import threading
+from collections import Counter, defaultdict
+
+from .catalog import get_catalog_version
+from .models import RecipeIngredient
+
+PANTRY_MAX_MISSING = 3
+PANTRY_MISSING_LIMIT = 10
+
+
+def _positions(mask):
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+class PantryIndex:
+    def __init__(self, rows):
+        self.recipe_ids = []
+        self.postings = defaultdict(int)
+        positions = {}
+        sizes = Counter()
+        for recipe_id, ingredient_id in rows:
+            position = positions.get(recipe_id)
+            if position is None:
+                position = positions[recipe_id] = len(self.recipe_ids)
+                self.recipe_ids.append(recipe_id)
+            self.postings[ingredient_id] |= 1 << position
+            sizes[position] += 1
+        self.by_size = defaultdict(int)
+        for position, size in sizes.items():
+            self.by_size[size] |= 1 << position
+
+    def coverage(self, ingredient_ids):
+        planes = []
+        for ingredient_id in ingredient_ids:
+            carry = self.postings.get(ingredient_id, 0)
+            for index, plane in enumerate(planes):
+                if not carry:
+                    break
+                planes[index], carry = plane ^ carry, plane & carry
+            if carry:
+                planes.append(carry)
+        return planes
+
+    def count_equals(self, planes, value, mask):
+        if value >> len(planes):
+            return 0
+        for index, plane in enumerate(planes):
+            mask &= plane if value >> index & 1 else ~plane
+        return mask
+
+    def search(self, ingredients, max_missing=PANTRY_MAX_MISSING):
+        planes = self.coverage(set(ingredients))
+        results = []
+        for missing in range(max_missing + 1):
+            matched = 0
+            for size, recipes in self.by_size.items():
+                if size > missing:
+                    matched |= self.count_equals(
+                        planes, size - missing, recipes
+                    )
+            results.extend(
+                (self.recipe_ids[position], missing)
+                for position in _positions(matched)
+            )
+        return results
+
+
+_index_state = {'index': None, 'version': None}
+_index_lock = threading.Lock()
+
+
+def get_pantry_index():
+    version = get_catalog_version('recipes')
+    if _index_state['version'] != version:
+        with _index_lock:
+            if _index_state['version'] != version:
+                _index_state['index'] = PantryIndex(
+                    RecipeIngredient.objects.order_by(
+                        '-recipe__pub_date', '-recipe_id'
+                    ).values_list('recipe_id', 'ingredient_id')
+                )
+                _index_state['version'] = version
+    return _index_state['index']
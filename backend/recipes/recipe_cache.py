@@ -0,0 +1,79 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from .catalog import get_catalog_version
+from .coalesce import get_many_coalesced
+from .relations import NO_RELATIONS, get_user_relations
+
+RECIPE_CACHE_TIMEOUT = 60 * 60
+RECIPE_CACHE_STATS = ('hits', 'misses')
+
+
+def _catalog_versions():
+    return get_catalog_version('tags'), get_catalog_version('ingredients')
+
+
+def _recipe_key(recipe_id, versions):
+    return f'recipes:detail:{recipe_id}:{versions[0]}:{versions[1]}'
+
+
+def _count(stat, amount=1):
+    if not amount:
+        return
+    key = f'recipe_cache:{stat}'
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        cache.add(key, amount, None)
+
+
+def get_recipe_cache_stats():
+    return {stat: cache.get(f'recipe_cache:{stat}', 0)
+            for stat in RECIPE_CACHE_STATS}
+
+
+def get_cached_recipes(recipe_ids, render_many):
+    versions = _catalog_versions()
+    rendered = []
+
+    def render(ids):
+        rendered.extend(ids)
+        return render_many(ids)
+
+    try:
+        return get_many_coalesced(
+            {recipe_id: _recipe_key(recipe_id, versions)
+             for recipe_id in recipe_ids},
+            render,
+            RECIPE_CACHE_TIMEOUT
+        )
+    finally:
+        _count('misses', len(rendered))
+        _count('hits', len(recipe_ids) - len(rendered))
+
+
+def get_cached_recipe(recipe_id, render):
+    return get_cached_recipes(
+        [recipe_id], lambda ids: {recipe_id: render()}
+    )[recipe_id]
+
+
+def invalidate_recipe(*recipe_ids):
+    versions = _catalog_versions()
+    keys = [_recipe_key(recipe_id, versions) for recipe_id in recipe_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def personalise_recipe(data, request):
+    relations = get_user_relations(request) or NO_RELATIONS
+    author = data['author']
+    return {
+        **data,
+        'image': request.build_absolute_uri(data['image']),
+        'is_favorited': data['id'] in relations['favorites'],
+        'is_in_shopping_cart': data['id'] in relations['shopping_cart'],
+        'author': {
+            **author,
+            'is_subscribed': author['id'] in relations['following'],
+        },
+    }
@@ -0,0 +1,105 @@
+import time
+
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+
+from .models import Favorite, Follow, ShoppingCart
+
+RELATIONS_CACHE_TIMEOUT = 60 * 60
+NO_RELATIONS = {
+    'favorites': frozenset(),
+    'shopping_cart': frozenset(),
+    'following': frozenset(),
+}
+
+
+def _insert_on_conflict_do_nothing(model, values):
+    obj = model(**values)
+    fields = [field for field in model._meta.concrete_fields
+              if not field.primary_key]
+    params = [
+        field.get_db_prep_save(field.pre_save(obj, True), connection)
+        for field in fields
+    ]
+    quote = connection.ops.quote_name
+    sql = (
+        f'INSERT INTO {quote(model._meta.db_table)} '
+        f'({", ".join(quote(field.column) for field in fields)}) '
+        f'VALUES ({", ".join(["%s"] * len(fields))}) '
+        f'ON CONFLICT DO NOTHING '
+        f'RETURNING {quote(model._meta.pk.column)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone() is not None
+
+
+def add_relation(model, **values):
+    if connection.vendor == 'postgresql':
+        return _insert_on_conflict_do_nothing(model, values)
+    try:
+        with transaction.atomic():
+            model.objects.create(**values)
+    except IntegrityError:
+        return False
+    return True
+
+
+def remove_relation(model, **values):
+    deleted, _ = model.objects.filter(**values).delete()
+    return deleted > 0
+
+
+def _generation_key(user_id):
+    return f'relations:{user_id}:generation'
+
+
+def _get_generation(user_id):
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        return cache.get(key, 0)
+    return generation
+
+
+def _bump_generation(user_id):
+    key = _generation_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def _relations_key(user_id, generation):
+    return f'relations:{user_id}:{generation}'
+
+
+def _load_relations(user):
+    return {
+        'favorites': frozenset(Favorite.objects.filter(
+            user=user).values_list('recipe_id', flat=True)),
+        'shopping_cart': frozenset(ShoppingCart.objects.filter(
+            user=user).values_list('recipe_id', flat=True)),
+        'following': frozenset(Follow.objects.filter(
+            user=user).values_list('author_id', flat=True)),
+    }
+
+
+def get_user_relations(request):
+    if request is None or request.user.is_anonymous:
+        return None
+    relations = getattr(request, '_user_relations', None)
+    if relations is None:
+        key = _relations_key(request.user.id,
+                             _get_generation(request.user.id))
+        relations = cache.get(key)
+        if relations is None:
+            relations = _load_relations(request.user)
+            cache.set(key, relations, RELATIONS_CACHE_TIMEOUT)
+        request._user_relations = relations
+    return relations
+
+
+def invalidate_user_relations(user_id):
+    transaction.on_commit(lambda: _bump_generation(user_id))
@@ -0,0 +1,214 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVectorField)
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .catalog import get_catalog_version
+from .models import Ingredient
+
+WORD_START = re.compile(r'(?:^|(?<=[\s\-(,]))\w', re.UNICODE)
+FUZZY_CANDIDATES = 50
+FUZZY_DELETIONS = 2
+FUZZY_TIME_BUDGET = 0.005
+SEARCH_CONFIG = 'russian'
+SEARCH_ORDERING = ('-search_rank', '-pub_date', '-id')
+
+
+def normalize_name(value):
+    return ' '.join(value.casefold().replace('ё', 'е').split())
+
+
+def trigrams(value):
+    padded = f'  {value} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def deletions(value, depth):
+    variants = {value}
+    for _ in range(depth):
+        variants |= {
+            variant[:i] + variant[i + 1:]
+            for variant in variants if len(variant) > 1
+            for i in range(len(variant))
+        }
+    return variants
+
+
+def edit_distance(first, second, max_distance):
+    if abs(len(first) - len(second)) > max_distance:
+        return max_distance + 1
+    before = None
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        current = [i]
+        for j, second_char in enumerate(second, 1):
+            distance = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (first_char != second_char)
+            )
+            if (before is not None and j > 1
+                    and first_char == second[j - 2]
+                    and first[i - 2] == second_char):
+                distance = min(distance, before[j - 2] + 1)
+            current.append(distance)
+        if min(current) > max_distance:
+            return max_distance + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+class IngredientIndex:
+    def __init__(self, items):
+        self.items = list(items)
+        self.by_id = {item['id']: item for item in self.items}
+        self.keys = [normalize_name(item['name']) for item in self.items]
+        prefixes = []
+        for position, key in enumerate(self.keys):
+            for match in WORD_START.finditer(key):
+                prefixes.append((key[match.start():], position))
+        prefixes.sort()
+        self.prefixes = prefixes
+        self.prefix_keys = [key for key, _ in prefixes]
+        self.word_starts = defaultdict(list)
+        for key, position in prefixes:
+            self.word_starts[position].append(len(self.keys[position])
+                                              - len(key))
+        self.trigrams = defaultdict(list)
+        self.words = defaultdict(set)
+        for position, key in enumerate(self.keys):
+            for trigram in trigrams(key):
+                self.trigrams[trigram].append(position)
+            for word in key.split(' '):
+                self.words[word].add(position)
+        self.deletions = defaultdict(set)
+        for word in self.words:
+            for variant in deletions(word, FUZZY_DELETIONS):
+                self.deletions[variant].add(word)
+
+    def _prefix_matches(self, query):
+        start = bisect_left(self.prefix_keys, query)
+        for key, position in self.prefixes[start:]:
+            if not key.startswith(query):
+                break
+            yield position
+
+    def search(self, name, limit=None):
+        query = normalize_name(name)
+        if not query:
+            return self.items[:limit]
+        ranked = {}
+        for position in self._prefix_matches(query):
+            tier = 0 if self.keys[position].startswith(query) else 1
+            ranked[position] = min(tier, ranked.get(position, tier))
+        if limit is None or len(ranked) < limit:
+            for position, key in enumerate(self.keys):
+                if position not in ranked and query in key:
+                    ranked[position] = 2
+        order = sorted(
+            ranked,
+            key=lambda pos: (ranked[pos], len(self.keys[pos]), pos)
+        )
+        return [self.items[position] for position in order[:limit]]
+
+    def _distance(self, query, position, max_distance, memo):
+        key = self.keys[position]
+        distances = [edit_distance(query, key, max_distance)]
+        for start in self.word_starts[position]:
+            word = key[start:].split(' ', 1)[0]
+            prefix = key[start:start + len(query)]
+            if word not in memo:
+                memo[word] = edit_distance(query, word, max_distance)
+            if prefix not in memo:
+                memo[prefix] = edit_distance(query, prefix, max_distance)
+            distances.extend((memo[word], memo[prefix] + 0.5))
+        return min(distances)
+
+    def fuzzy_search(self, name, limit=None):
+        query = normalize_name(name)
+        if not query:
+            return self.items[:limit]
+        deadline = time.perf_counter() + FUZZY_TIME_BUDGET
+        max_distance = max(1, len(query) // 3)
+        shared = Counter()
+        for trigram in trigrams(query):
+            shared.update(self.trigrams.get(trigram, ()))
+        candidates = {}
+        depth = min(max_distance, FUZZY_DELETIONS)
+        for variant in deletions(query, depth):
+            for word in self.deletions.get(variant, ()):
+                for position in self.words[word]:
+                    candidates[position] = shared[position]
+        for position, count in shared.most_common(FUZZY_CANDIDATES):
+            candidates.setdefault(position, count)
+        ranked = {}
+        memo = {}
+        for position, count in candidates.items():
+            distance = self._distance(query, position, max_distance, memo)
+            if distance <= max_distance:
+                ranked[position] = (distance, -count,
+                                    len(self.keys[position]), position)
+            if time.perf_counter() > deadline:
+                break
+        order = sorted(ranked, key=ranked.get)
+        return [self.items[position] for position in order[:limit]]
+
+
+_index_state = {'index': None, 'version': None}
+_index_lock = threading.Lock()
+
+
+def get_ingredient_index():
+    version = get_catalog_version('ingredients')
+    if _index_state['version'] != version:
+        with _index_lock:
+            if _index_state['version'] != version:
+                _index_state['index'] = IngredientIndex(
+                    Ingredient.objects.values(
+                        'id', 'name', 'measurement_unit'
+                    )
+                )
+                _index_state['version'] = version
+    return _index_state['index']
+
+
+def _search_recipes_fallback(queryset, value):
+    condition = Q()
+    for word in value.split():
+        pattern = re.escape(word)
+        condition &= Q(name__iregex=pattern) | Q(text__iregex=pattern)
+    return queryset.filter(condition).annotate(
+        search_rank=Case(
+            When(name__iregex=re.escape(value), then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField()
+        )
+    ).order_by(*SEARCH_ORDERING)
+
+
+def search_recipes(queryset, value):
+    value = value.strip()
+    if not value:
+        return queryset
+    if connection.vendor != 'postgresql':
+        return _search_recipes_fallback(queryset, value)
+    quote = connection.ops.quote_name
+    vector = RawSQL(
+        f'{quote(queryset.model._meta.db_table)}.{quote("search_vector")}',
+        [],
+        output_field=SearchVectorField()
+    )
+    query = SearchQuery(value, config=SEARCH_CONFIG,
+                        search_type='websearch')
+    return queryset.alias(search_vector=vector).filter(
+        search_vector=query
+    ).annotate(
+        search_rank=SearchRank(F('search_vector'), query)
+    ).order_by(*SEARCH_ORDERING)
@@ -1,12 +1,23 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from rest_framework import serializers
-from rest_framework.generics import get_object_or_404
 
 from users.serializers import UserDetailSerializer
-from .fields import Base64ImageField
+from .catalog import bump_catalog_version_on_commit
+from .cooccurrence import (SUGGESTIONS_LIMIT, change_ingredient_pairs,
+                           recipe_ingredient_ids)
+from .counters import count_added
+from .feed import fan_out_recipe
+from .fields import (Base64ImageField, BatchedListSerializer,
+                     BatchedPrimaryKeyRelatedField)
 from .models import (Tag, Ingredient, Recipe, RecipeIngredient, ReceiptTag,
-                     Follow, Favorite, ShoppingCart)
+                     Favorite, ShoppingCart)
+from .pantry import PANTRY_MAX_MISSING, PANTRY_MISSING_LIMIT
+from .recipe_cache import invalidate_recipe
+from .relations import get_user_relations
+from .shopping_list import rebuild_shopping_lists
+from .similarity import refresh_similar_recipes
 
 User = get_user_model()
 
@@ -51,6 +62,24 @@ class IngredientSerializer(serializers.ModelSerializer):
         )
 
 
+class IngredientSearchSerializer(serializers.Serializer):
+    name = serializers.CharField(allow_blank=True, trim_whitespace=False)
+    limit = serializers.IntegerField(min_value=1, required=False)
+    fuzzy = serializers.BooleanField(allow_null=True, default=None)
+
+
+class IngredientSuggestSerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False
+    )
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=50,
+        default=SUGGESTIONS_LIMIT
+    )
+
+
 class IngredientInRecipeSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source='ingredient.id')
     name = serializers.ReadOnlyField(source='ingredient.name')
@@ -87,13 +116,14 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
 
 
 class AddIngredientToRecipeSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
+    id = BatchedPrimaryKeyRelatedField(
         queryset=Ingredient.objects.all()
     )
     amount = serializers.IntegerField()
 
     class Meta:
         model = RecipeIngredient
+        list_serializer_class = BatchedListSerializer
         fields = (
             'id',
             'amount'
@@ -123,28 +153,40 @@ class ShowRecipeSerializer(serializers.ModelSerializer):
         )
 
     def get_ingredients(self, obj):
-        record = RecipeIngredient.objects.filter(recipe=obj)
         return IngredientInRecipeSerializer(
-            record,
+            obj.recipeingredient_set.all(),
             many=True).data
 
     def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        if not request or request.user.is_anonymous:
+        relations = get_user_relations(self.context.get('request'))
+        if relations is None:
             return False
-        user = request.user
-        return Favorite.objects.filter(
-            recipe=obj,
-            user=user).exists()
+        return obj.id in relations['favorites']
 
     def get_is_in_shopping_cart(self, obj):
-        request = self.context.get('request')
-        if not request or request.user.is_anonymous:
+        relations = get_user_relations(self.context.get('request'))
+        if relations is None:
             return False
-        user = request.user
-        return ShoppingCart.objects.filter(
-            recipe=obj,
-            user=user).exists()
+        return obj.id in relations['shopping_cart']
+
+
+class PantryRecipeSerializer(ShowRecipeSerializer):
+    missing = serializers.IntegerField(read_only=True)
+
+    class Meta(ShowRecipeSerializer.Meta):
+        fields = ShowRecipeSerializer.Meta.fields + ('missing',)
+
+
+class PantrySearchSerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False
+    )
+    max_missing = serializers.IntegerField(
+        min_value=0,
+        max_value=PANTRY_MISSING_LIMIT,
+        default=PANTRY_MAX_MISSING
+    )
 
 
 class CreateRecipeSerializer(serializers.ModelSerializer):
@@ -154,7 +196,7 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
     )
     author = UserDetailSerializer(read_only=True)
     ingredients = AddIngredientToRecipeSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BatchedPrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True
     )
@@ -222,41 +264,87 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         return data
 
     def add_tags(self, tags, recipe):
-        for tag in tags:
-            ReceiptTag.objects.create(recipe=recipe, tag=tag)
+        ReceiptTag.objects.bulk_create(
+            ReceiptTag(recipe=recipe, tag=tag) for tag in tags
+        )
 
     def add_ingredient(self, ingredients, recipe):
-        for ingredient in ingredients:
-            ingredient_model = ingredient['id']
-            amount = ingredient['amount']
-            RecipeIngredient.objects.create(
-                ingredient=ingredient_model,
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                ingredient=ingredient['id'],
                 recipe=recipe,
-                amount=amount
+                amount=ingredient['amount']
             )
+            for ingredient in ingredients
+        )
 
+    def update_tags(self, tags, recipe):
+        new_ids = {tag.id for tag in tags}
+        old_ids = set(ReceiptTag.objects.filter(
+            recipe=recipe).values_list('tag_id', flat=True))
+        ReceiptTag.objects.filter(
+            recipe=recipe, tag_id__in=old_ids - new_ids).delete()
+        self.add_tags(
+            [tag for tag in tags if tag.id not in old_ids], recipe
+        )
+
+    def update_ingredients(self, ingredients, recipe):
+        amounts = {item['id'].id: item['amount'] for item in ingredients}
+        old_rows = RecipeIngredient.objects.filter(recipe=recipe)
+        changed = []
+        removed = []
+        for row in old_rows:
+            if row.ingredient_id not in amounts:
+                removed.append(row.id)
+            elif row.amount != amounts[row.ingredient_id]:
+                row.amount = amounts[row.ingredient_id]
+                changed.append(row)
+        existing = {row.ingredient_id for row in old_rows}
+        RecipeIngredient.objects.filter(id__in=removed).delete()
+        RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        self.add_ingredient(
+            [item for item in ingredients if item['id'].id not in existing],
+            recipe
+        )
+
+    @transaction.atomic
     def create(self, validated_data):
         tags_data = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
         author = self.context.get('request').user
         recipe = Recipe.objects.create(author=author, **validated_data)
+        count_added(recipe)
+        fan_out_recipe(recipe)
         self.add_ingredient(ingredients_data, recipe)
         self.add_tags(tags_data, recipe)
+        change_ingredient_pairs(
+            [], [item['id'].id for item in ingredients_data])
+        refresh_similar_recipes(recipe.id)
+        bump_catalog_version_on_commit('recipes')
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags_data = validated_data.pop('tags')
         ingredient_data = validated_data.pop('ingredients')
-        ReceiptTag.objects.filter(recipe=instance).delete()
-        self.add_tags(tags_data, instance)
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        self.add_ingredient(ingredient_data, instance)
+        old_ingredients = recipe_ingredient_ids(instance.id)
+        self.update_tags(tags_data, instance)
+        self.update_ingredients(ingredient_data, instance)
+        change_ingredient_pairs(
+            old_ingredients, [item['id'].id for item in ingredient_data])
         instance.name = validated_data.pop('name')
         instance.text = validated_data.pop('text')
         if validated_data.get('image') is not None:
             instance.image = validated_data.pop('image')
         instance.cooking_time = validated_data.pop('cooking_time')
-        instance.save()
+        instance.save(update_fields=[
+            'name', 'text', 'image', 'cooking_time', 'updated_at'
+        ])
+        rebuild_shopping_lists(User.objects.filter(
+            shopping_cart__recipe=instance))
+        refresh_similar_recipes(instance.id)
+        invalidate_recipe(instance.id)
+        bump_catalog_version_on_commit('recipes')
         return instance
 
     def to_representation(self, instance):
@@ -268,70 +356,15 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         ).data
 
 
-class FavoriteSerializer(serializers.ModelSerializer):
-    recipe = serializers.PrimaryKeyRelatedField(queryset=Recipe.objects.all())
-    user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
-
-    class Meta:
-        model = Favorite
-        fields = (
-            'user',
-            'recipe'
-        )
-
-    def validate(self, data):
-        user = self.context.get('request').user
-        recipe_id = data['recipe'].id
-
-        if (self.context.get('request').method == 'GET'
-                and Favorite.objects.filter(
-                    user=user,
-                    recipe__id=recipe_id).exists()):
-            raise serializers.ValidationError(
-                'Рецепт уже добавлен в избранное')
-
-        recipe = get_object_or_404(Recipe, id=recipe_id)
-
-        if (self.context.get('request').method == 'DELETE'
-                and not Favorite.objects.filter(
-                    user=user,
-                    recipe=recipe).exists()):
-            raise serializers.ValidationError(
-                'Такого рецепта не существует')
-
-        return data
-
-    def to_representation(self, instance):
-        request = self.context.get('request')
-        context = {'request': request}
-        return ShowRecipeAddedSerializer(
-            instance.recipe,
-            context=context).data
-
-
-class ShoppingCartSerializer(FavoriteSerializer):
-    class Meta(FavoriteSerializer.Meta):
-        model = ShoppingCart
-
-    def validate(self, data):
-        user = self.context.get('request').user
-        recipe_id = data['recipe'].id
-        if (self.context.get('request').method == 'GET'
-                and ShoppingCart.objects.filter(
-                    user=user,
-                    recipe__id=recipe_id).exists()):
-            raise serializers.ValidationError(
-                'Продукты уже в корзине')
-
-        recipe = get_object_or_404(Recipe, id=recipe_id)
-
-        if (self.context.get('request').method == 'DELETE'
-                and not ShoppingCart.objects.filter(
-                    user=user,
-                    recipe=recipe).exists()):
-            raise serializers.ValidationError(
-                'Такого рецепта нет в списке покупок')
-        return data
+def get_recipes_limit(request):
+    field = serializers.IntegerField(min_value=0)
+    value = request.query_params.get('recipes_limit')
+    if value is None:
+        return settings.RECIPES_LIMIT
+    try:
+        return field.run_validation(value)
+    except serializers.ValidationError as exc:
+        raise serializers.ValidationError({'recipes_limit': exc.detail})
 
 
 class ShowFollowSerializer(serializers.ModelSerializer):
@@ -353,16 +386,18 @@ class ShowFollowSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if not request or request.user.is_anonymous:
+        relations = get_user_relations(self.context.get('request'))
+        if relations is None:
             return False
-        return obj.follower.filter(
-            user=obj,
-            author=request.user).exists()
+        return obj.id in relations['following']
 
     def get_recipes(self, obj):
-        recipes = obj.recipes.all()[:settings.RECIPES_LIMIT]
         request = self.context.get('request')
+        recipes_by_author = self.context.get('recipes_by_author')
+        if recipes_by_author is not None:
+            recipes = recipes_by_author.get(obj.id, [])
+        else:
+            recipes = obj.recipes.all()[:get_recipes_limit(request)]
         context = {'request': request}
         return ShowRecipeAddedSerializer(
             recipes,
@@ -370,37 +405,4 @@ class ShowFollowSerializer(serializers.ModelSerializer):
             context=context).data
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
-
-class FollowSerializer(serializers.ModelSerializer):
-    queryset = User.objects.all()
-    user = serializers.PrimaryKeyRelatedField(queryset=queryset)
-    author = serializers.PrimaryKeyRelatedField(queryset=queryset)
-
-    class Meta:
-        model = Follow
-        fields = (
-            'user',
-            'author'
-        )
-
-    def validate(self, data):
-        user = self.context.get('request').user
-        author_id = data['author'].id
-        follow_exist = Follow.objects.filter(
-            user=user,
-            author__id=author_id).exists()
-
-        if self.context.get('request').method == 'GET':
-            if user.id == author_id or follow_exist:
-                raise serializers.ValidationError(
-                    'Подписка существует')
-        return data
-
-    def to_representation(self, instance):
-        request = self.context.get('request')
-        context = {'request': request}
-        return ShowFollowSerializer(
-            instance.author,
-            context=context).data
+        return obj.recipes_count
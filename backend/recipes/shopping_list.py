@@ -0,0 +1,162 @@
+import csv
+import hashlib
+import json
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+from .units import humanize, normalize
+
+User = get_user_model()
+
+EXPORT_FORMATS = {
+    'txt': 'text/plain; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+DEFAULT_FORMAT = 'txt'
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def get_shopping_list(user):
+    return ShoppingListItem.objects.filter(user=user).values_list(
+        'name', 'measurement_unit', 'amount'
+    ).iterator()
+
+
+def _recipe_amounts(recipe):
+    totals = defaultdict(int)
+    rows = RecipeIngredient.objects.filter(recipe=recipe).values_list(
+        'ingredient__name', 'ingredient__measurement_unit', 'amount'
+    )
+    for name, measurement_unit, amount in rows:
+        measurement_unit, amount = normalize(measurement_unit, amount)
+        totals[(name, measurement_unit)] += amount
+    return totals
+
+
+@transaction.atomic
+def _change_shopping_list(user, recipe, sign):
+    list(User.objects.select_for_update().filter(
+        pk=user.pk).values_list('pk'))
+    totals = _recipe_amounts(recipe)
+    items = {
+        (item.name, item.measurement_unit): item
+        for item in ShoppingListItem.objects.filter(
+            user=user, name__in={name for name, _ in totals}
+        )
+    }
+    created = []
+    for key, amount in totals.items():
+        if key in items:
+            items[key].amount += sign * amount
+        elif sign > 0:
+            created.append(ShoppingListItem(
+                user=user, name=key[0], measurement_unit=key[1],
+                amount=amount
+            ))
+    ShoppingListItem.objects.filter(
+        id__in=[item.id for item in items.values() if item.amount <= 0]
+    ).delete()
+    ShoppingListItem.objects.bulk_update(
+        [item for item in items.values() if item.amount > 0], ['amount']
+    )
+    ShoppingListItem.objects.bulk_create(created)
+
+
+def add_to_shopping_list(user, recipe):
+    _change_shopping_list(user, recipe, 1)
+
+
+def remove_from_shopping_list(user, recipe):
+    _change_shopping_list(user, recipe, -1)
+
+
+@transaction.atomic
+def rebuild_shopping_lists(users):
+    user_ids = list(users.values_list('id', flat=True).distinct())
+    ShoppingListItem.objects.filter(user_id__in=user_ids).delete()
+    rows = ShoppingCart.objects.filter(
+        user_id__in=user_ids,
+        recipe__recipeingredient__isnull=False
+    ).values(
+        'user_id',
+        'recipe__recipeingredient__ingredient__name',
+        'recipe__recipeingredient__ingredient__measurement_unit',
+    ).annotate(
+        total=Sum('recipe__recipeingredient__amount')
+    ).order_by()
+    totals = defaultdict(int)
+    for row in rows.iterator():
+        measurement_unit, amount = normalize(
+            row['recipe__recipeingredient__ingredient__measurement_unit'],
+            row['total']
+        )
+        name = row['recipe__recipeingredient__ingredient__name']
+        totals[(row['user_id'], name, measurement_unit)] += amount
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(user_id=user_id, name=name,
+                         measurement_unit=measurement_unit, amount=amount)
+        for (user_id, name, measurement_unit), amount in totals.items()
+    )
+
+
+def shopping_list_etag(request, *args, **kwargs):
+    if request.user.is_anonymous:
+        return None
+    state = ShoppingCart.objects.filter(user=request.user).aggregate(
+        count=Count('id'),
+        recipes=Sum('recipe_id'),
+        last_added=Max('added_date'),
+        last_updated=Max('recipe__updated_at'),
+    )
+    state.update(ShoppingListItem.objects.filter(
+        user=request.user
+    ).aggregate(items=Count('id'), last_item=Max('id')))
+    export_format = request.GET.get('format', DEFAULT_FORMAT)
+    key = f'{export_format}:{sorted(state.items())}'
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def _rows(items):
+    for name, measurement_unit, amount in items:
+        yield (name, *humanize(measurement_unit, amount))
+
+
+def stream_txt(items):
+    for name, measurement_unit, amount in _rows(items):
+        yield f'{name} - {amount} {measurement_unit}\n'
+
+
+def stream_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for row in _rows(items):
+        yield writer.writerow(row)
+
+
+def stream_json(items):
+    separator = '['
+    for name, measurement_unit, amount in _rows(items):
+        yield separator + json.dumps(
+            {'name': name,
+             'measurement_unit': measurement_unit,
+             'amount': amount},
+            ensure_ascii=False
+        )
+        separator = ','
+    yield ']' if separator == ',' else '[]'
+
+
+STREAMERS = {
+    'txt': stream_txt,
+    'csv': stream_csv,
+    'json': stream_json,
+}
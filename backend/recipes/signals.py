@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .cards import refresh_author_cards
+
+User = get_user_model()
+
+AUTHOR_CARD_FIELDS = frozenset(
+    ('email', 'username', 'first_name', 'last_name')
+)
+
+
+@receiver(post_save, sender=User, dispatch_uid='refresh_author_cards')
+def refresh_cards_on_author_save(sender, instance, created, raw,
+                                 update_fields, **kwargs):
+    if created or raw:
+        return
+    if update_fields is not None and AUTHOR_CARD_FIELDS.isdisjoint(
+            update_fields):
+        return
+    refresh_author_cards(instance.id)
@@ -0,0 +1,152 @@
+import heapq
+from collections import defaultdict
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Q
+
+from .models import ReceiptTag, RecipeIngredient, SimilarRecipe
+
+SIMILAR_RECIPES_LIMIT = 10
+SIMILAR_MAX_INGREDIENT_RECIPES = 1000
+
+
+class FeatureIndex:
+    def __init__(self, ingredient_rows, tag_rows):
+        self.ingredients = defaultdict(set)
+        self.tags = defaultdict(set)
+        self.postings = defaultdict(set)
+        for recipe_id, ingredient_id in ingredient_rows:
+            self.ingredients[recipe_id].add(ingredient_id)
+            self.postings[ingredient_id].add(recipe_id)
+        for recipe_id, tag_id in tag_rows:
+            self.tags[recipe_id].add(tag_id)
+        for ingredient_id, recipes in self.postings.items():
+            if len(recipes) > SIMILAR_MAX_INGREDIENT_RECIPES:
+                self.postings[ingredient_id] = set(heapq.nlargest(
+                    SIMILAR_MAX_INGREDIENT_RECIPES, recipes
+                ))
+
+    def scores(self, recipe_id, ingredients, tags):
+        candidates = {
+            other
+            for ingredient_id in ingredients
+            for other in self.postings.get(ingredient_id, ())
+        }
+        candidates.discard(recipe_id)
+        size = len(ingredients) + len(tags)
+        scores = {}
+        for other in candidates:
+            count = (len(ingredients & self.ingredients[other])
+                     + len(tags & self.tags[other]))
+            other_size = len(self.ingredients[other]) + len(self.tags[other])
+            scores[other] = count / (size + other_size - count)
+        return scores
+
+
+def _top(scores):
+    return dict(heapq.nlargest(
+        SIMILAR_RECIPES_LIMIT, scores.items(),
+        key=lambda item: (item[1], item[0])
+    ))
+
+
+def _recipe_features(recipe_id):
+    return (
+        set(RecipeIngredient.objects.filter(
+            recipe_id=recipe_id).values_list('ingredient_id', flat=True)),
+        set(ReceiptTag.objects.filter(
+            recipe_id=recipe_id).values_list('tag_id', flat=True)),
+    )
+
+
+def _candidates(ingredients):
+    candidates = set()
+    for ingredient_id in ingredients:
+        candidates.update(RecipeIngredient.objects.filter(
+            ingredient_id=ingredient_id
+        ).order_by('-recipe_id').values_list(
+            'recipe_id', flat=True
+        )[:SIMILAR_MAX_INGREDIENT_RECIPES])
+    return candidates
+
+
+def _scores(recipe_id):
+    ingredients, tags = _recipe_features(recipe_id)
+    candidates = _candidates(ingredients)
+    index = FeatureIndex(
+        RecipeIngredient.objects.filter(recipe_id__in=candidates).values_list(
+            'recipe_id', 'ingredient_id'),
+        ReceiptTag.objects.filter(recipe_id__in=candidates).values_list(
+            'recipe_id', 'tag_id'),
+    )
+    return index.scores(recipe_id, ingredients, tags)
+
+
+def _store(recipe_id, neighbours):
+    SimilarRecipe.objects.filter(recipe_id=recipe_id).delete()
+    SimilarRecipe.objects.bulk_create(
+        SimilarRecipe(recipe_id=recipe_id, similar_id=other, score=score)
+        for other, score in neighbours.items()
+    )
+
+
+@transaction.atomic
+def refresh_similar_recipes(recipe_id):
+    scores = _scores(recipe_id)
+    _store(recipe_id, _top(scores))
+    lists = defaultdict(dict)
+    for owner, other, score in SimilarRecipe.objects.filter(
+            Q(recipe_id__in=list(scores))
+            | Q(recipe_id__in=SimilarRecipe.objects.filter(
+                similar_id=recipe_id).values('recipe_id'))
+    ).exclude(recipe_id=recipe_id).values_list(
+            'recipe_id', 'similar_id', 'score'):
+        lists[owner][other] = score
+    for owner in set(scores) | set(lists):
+        neighbours = dict(lists[owner])
+        old_score = neighbours.pop(recipe_id, None)
+        new_score = scores.get(owner)
+        if (old_score is not None
+                and (new_score is None or new_score < old_score)
+                and len(lists[owner]) == SIMILAR_RECIPES_LIMIT):
+            _store(owner, _top(_scores(owner)))
+            continue
+        if new_score is not None:
+            neighbours[recipe_id] = new_score
+        neighbours = _top(neighbours)
+        if neighbours != lists[owner]:
+            _store(owner, neighbours)
+
+
+def listing_recipes(recipe_ids):
+    return set(SimilarRecipe.objects.filter(
+        similar_id__in=recipe_ids
+    ).exclude(recipe_id__in=recipe_ids).values_list('recipe_id', flat=True))
+
+
+@transaction.atomic
+def rebuild_similar_recipes(recipe_ids):
+    for recipe_id in recipe_ids:
+        _store(recipe_id, _top(_scores(recipe_id)))
+
+
+def build_similar_recipes(get_model=apps.get_model):
+    index = FeatureIndex(
+        get_model('recipes.RecipeIngredient').objects.values_list(
+            'recipe_id', 'ingredient_id').iterator(),
+        get_model('recipes.ReceiptTag').objects.values_list(
+            'recipe_id', 'tag_id').iterator(),
+    )
+    similar_recipe = get_model('recipes.SimilarRecipe')
+    rows = [
+        similar_recipe(recipe_id=recipe_id, similar_id=other, score=score)
+        for recipe_id, ingredients in index.ingredients.items()
+        for other, score in _top(index.scores(
+            recipe_id, ingredients, index.tags[recipe_id]
+        )).items()
+    ]
+    with transaction.atomic():
+        similar_recipe.objects.all().delete()
+        similar_recipe.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -0,0 +1,69 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+TRENDING_EPOCH = datetime(2021, 1, 1, tzinfo=timezone.utc)
+TRENDING_HALF_LIFE = timedelta(days=7)
+TRENDING_LAG = timedelta(minutes=1)
+TRENDING_REBASE_AFTER = timedelta(weeks=52)
+TRENDING_EVENTS = {
+    'recipes.Favorite': 2,
+    'recipes.ShoppingCart': 1,
+}
+
+
+def decay(moment, epoch):
+    return 2 ** ((moment - epoch) / TRENDING_HALF_LIFE)
+
+
+def event_score(weight, moment, epoch=TRENDING_EPOCH):
+    return weight * decay(moment, epoch)
+
+
+def rebase_trending(recipe_score, epoch, now):
+    if now - epoch <= TRENDING_REBASE_AFTER:
+        return epoch
+    recipe_score.objects.update(
+        score=F('score') * decay(epoch, now), epoch=now
+    )
+    return now
+
+
+def refresh_trending(get_model=apps.get_model):
+    recipe_score = get_model('recipes.RecipeScore')
+    now = timezone.now() - TRENDING_LAG
+    with transaction.atomic():
+        state = recipe_score.objects.aggregate(
+            since=Max('updated_at'), epoch=Max('epoch'))
+        since = state['since']
+        epoch = rebase_trending(
+            recipe_score, state['epoch'] or TRENDING_EPOCH, now
+        )
+        deltas = defaultdict(float)
+        for label, weight in TRENDING_EVENTS.items():
+            events = get_model(label).objects.filter(added_date__lte=now)
+            if since is not None:
+                events = events.filter(added_date__gt=since)
+            for recipe_id, added_date in events.values_list(
+                    'recipe_id', 'added_date').iterator():
+                deltas[recipe_id] += event_score(weight, added_date, epoch)
+        scores = recipe_score.objects.in_bulk(list(deltas))
+        created = []
+        for recipe_id, delta in deltas.items():
+            if recipe_id in scores:
+                scores[recipe_id].score += delta
+                scores[recipe_id].updated_at = now
+            else:
+                created.append(recipe_score(
+                    recipe_id=recipe_id, score=delta, updated_at=now,
+                    epoch=epoch
+                ))
+        recipe_score.objects.bulk_update(
+            scores.values(), ['score', 'updated_at'], batch_size=1000
+        )
+        recipe_score.objects.bulk_create(created, batch_size=1000)
+    return len(deltas)
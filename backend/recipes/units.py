@@ -0,0 +1,27 @@
+BASE_UNITS = {
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+}
+DISPLAY_UNITS = {
+    'г': ('кг', 1000),
+    'мл': ('л', 1000),
+}
+
+
+def normalize(measurement_unit, amount):
+    base_unit, factor = BASE_UNITS.get(
+        measurement_unit, (measurement_unit, 1)
+    )
+    return base_unit, amount * factor
+
+
+def humanize(measurement_unit, amount):
+    if measurement_unit not in DISPLAY_UNITS:
+        return measurement_unit, amount
+    display_unit, factor = DISPLAY_UNITS[measurement_unit]
+    if amount < factor:
+        return measurement_unit, amount
+    amount = round(amount / factor, 3)
+    return display_unit, int(amount) if amount.is_integer() else amount
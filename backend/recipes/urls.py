@@ -3,7 +3,9 @@ from rest_framework.routers import DefaultRouter
 
 from .views import (FavoriteViewSet, IngredientViewSet, RecipeViewSet,
                     ShoppingCartViewSet, TagViewSet, ListFollowViewSet,
-                    FollowViewSet, DownloadShoppingCart)
+                    FollowViewSet, DownloadShoppingCart, PantryView,
+                    SimilarRecipesView, IngredientSuggestView, FeedView,
+                    RecipeCacheStatsView)
 
 router = DefaultRouter()
 
@@ -18,6 +20,16 @@ urlpatterns = [
          FollowViewSet.as_view(), name='subscribe'),
     path('recipes/download_shopping_cart/',
          DownloadShoppingCart.as_view(), name='download_shopping_cart'),
+    path('ingredients/suggest/',
+         IngredientSuggestView.as_view(), name='ingredient_suggest'),
+    path('recipes/feed/',
+         FeedView.as_view(), name='feed'),
+    path('recipes/cache_stats/',
+         RecipeCacheStatsView.as_view(), name='recipe_cache_stats'),
+    path('recipes/pantry/',
+         PantryView.as_view(), name='pantry'),
+    path('recipes/<int:recipe_id>/similar/',
+         SimilarRecipesView.as_view(), name='similar'),
     path('recipes/<int:recipe_id>/favorite/',
          FavoriteViewSet.as_view(), name='favorite'),
     path('recipes/<int:recipe_id>/shopping_cart/',
@@ -1,34 +1,65 @@
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, status, generics
+from rest_framework import generics, status, viewsets
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
+from .cards import get_recipe_cards, refresh_recipe_cards
+from .catalog import CachedCatalogMixin, bump_catalog_version_on_commit
+from .cooccurrence import (change_ingredient_pairs, recipe_ingredient_ids,
+                           suggest_ingredients)
+from .counters import change_counter, count_removed
+from .feed import backfill_feed, clear_feed, sync_feed
 from .filters import RecipeFilter, IngredientFilter
-from .models import (Tag, Ingredient, Recipe, Favorite, ShoppingCart,
-                     RecipeIngredient, Follow)
-from .paginators import CustomPageNumberPaginator
+from .list_cache import get_cached_page, get_list_cache_key
+from .models import (Tag, Ingredient, Recipe, Favorite, ShoppingCart, Follow,
+                     SimilarRecipe, FeedEntry)
+from .pantry import get_pantry_index
+from .paginators import (CustomPageNumberPaginator, FeedPaginator,
+                         ListPageNumberPaginator)
 from .permissions import AdminOrAuthorOrReadOnly
+from .recipe_cache import (get_cached_recipe, get_cached_recipes,
+                           get_recipe_cache_stats, invalidate_recipe,
+                           personalise_recipe)
+from .relations import (add_relation, invalidate_user_relations,
+                        remove_relation)
+from .search import get_ingredient_index
 from .serializers import (TagSerializer, IngredientSerializer,
                           ShowRecipeSerializer, CreateRecipeSerializer,
-                          FavoriteSerializer, ShoppingCartSerializer,
-                          ShowFollowSerializer, FollowSerializer)
+                          ShowRecipeAddedSerializer, ShowFollowSerializer,
+                          IngredientSearchSerializer,
+                          IngredientSuggestSerializer, PantryRecipeSerializer,
+                          PantrySearchSerializer, get_recipes_limit)
+from .shopping_list import (DEFAULT_FORMAT, EXPORT_FORMATS, STREAMERS,
+                            add_to_shopping_list, get_shopping_list,
+                            rebuild_shopping_lists, remove_from_shopping_list,
+                            shopping_list_etag)
+from .similarity import listing_recipes, rebuild_similar_recipes
 
 User = get_user_model()
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedCatalogMixin, viewsets.ReadOnlyModelViewSet):
+    catalog = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [AllowAny, ]
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedCatalogMixin, viewsets.ReadOnlyModelViewSet):
+    catalog = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [AllowAny, ]
@@ -36,6 +67,34 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend, ]
     filterset_class = IngredientFilter
 
+    def get_catalog_data(self, request, *args, **kwargs):
+        if 'name' not in request.query_params:
+            return super().get_catalog_data(request, *args, **kwargs)
+        params = IngredientSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        fuzzy = params.validated_data.pop('fuzzy', None)
+        index = get_ingredient_index()
+        if fuzzy:
+            return index.fuzzy_search(**params.validated_data)
+        results = index.search(**params.validated_data)
+        if not results and fuzzy is None:
+            return index.fuzzy_search(**params.validated_data)
+        return results
+
+
+class IngredientSuggestView(APIView):
+    permission_classes = [AllowAny, ]
+
+    def get(self, request):
+        params = IngredientSuggestSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        index = get_ingredient_index()
+        return Response([
+            index.by_id[ingredient_id]
+            for ingredient_id in suggest_ingredients(**params.validated_data)
+            if ingredient_id in index.by_id
+        ])
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
@@ -44,6 +103,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filterset_class = RecipeFilter
     pagination_class = CustomPageNumberPaginator
 
+    def get_queryset(self):
+        return Recipe.objects.with_related()
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return ShowRecipeSerializer
@@ -54,33 +116,160 @@ class RecipeViewSet(viewsets.ModelViewSet):
         context.update({'request': self.request})
         return context
 
+    def paginate_recipe_ids(self):
+        page = self.paginate_queryset(self.filter_queryset(
+            Recipe.objects.only('id', 'pub_date')
+        ))
+        return {'ids': [recipe.id for recipe in page],
+                'page': self.paginator.get_page_state()}
+
+    def list(self, request, *args, **kwargs):
+        key = get_list_cache_key(request.query_params)
+        if key is None:
+            ids = self.paginate_recipe_ids()['ids']
+        else:
+            state = get_cached_page(key, self.paginate_recipe_ids)
+            self.paginator.restore_page_state(request, state['page'])
+            ids = state['ids']
+        data = get_cached_recipes(ids, get_recipe_cards)
+        return self.get_paginated_response([
+            personalise_recipe(data[recipe_id], request)
+            for recipe_id in ids if recipe_id in data
+        ])
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            recipe_id = int(kwargs['pk'])
+        except ValueError:
+            raise Http404
+        data = get_cached_recipe(
+            recipe_id,
+            lambda: dict(ShowRecipeSerializer(self.get_object()).data)
+        )
+        return Response(personalise_recipe(data, request))
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        refresh_recipe_cards([serializer.save().id])
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        refresh_recipe_cards([serializer.save().id])
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        invalidate_recipe(instance.id)
+        users = list(User.objects.filter(
+            shopping_cart__recipe=instance).values_list('id', flat=True))
+        listing = listing_recipes([instance.id])
+        ingredients = recipe_ingredient_ids(instance.id)
+        instance.delete()
+        change_ingredient_pairs(ingredients, [])
+        count_removed(instance)
+        rebuild_shopping_lists(User.objects.filter(id__in=users))
+        rebuild_similar_recipes(listing)
+        bump_catalog_version_on_commit('recipes')
+
+
+class FeedView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated, ]
+    serializer_class = ShowRecipeSerializer
+    pagination_class = FeedPaginator
+
+    def get(self, request):
+        sync_feed(request.user)
+        page = self.paginate_queryset(
+            FeedEntry.objects.filter(user=request.user).only(
+                'recipe_id', 'pub_date')
+        )
+        recipes = Recipe.objects.with_related().in_bulk(
+            [entry.recipe_id for entry in page]
+        )
+        return self.get_paginated_response(self.get_serializer(
+            [recipes[entry.recipe_id] for entry in page
+             if entry.recipe_id in recipes],
+            many=True
+        ).data)
+
+
+class PantryView(generics.GenericAPIView):
+    permission_classes = [AllowAny, ]
+    serializer_class = PantryRecipeSerializer
+    pagination_class = ListPageNumberPaginator
+
+    def get(self, request):
+        params = PantrySearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        page = self.paginate_queryset(
+            get_pantry_index().search(**params.validated_data)
+        )
+        recipes = Recipe.objects.with_related().in_bulk(
+            [recipe_id for recipe_id, _ in page]
+        )
+        results = []
+        for recipe_id, missing in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                recipe.missing = missing
+                results.append(recipe)
+        return self.get_paginated_response(
+            self.get_serializer(results, many=True).data
+        )
+
+
+class SimilarRecipesView(APIView):
+    permission_classes = [AllowAny, ]
+
+    def get(self, request, recipe_id):
+        recipe = get_object_or_404(Recipe, id=recipe_id)
+        similar = [
+            row.similar for row in SimilarRecipe.objects.filter(
+                recipe=recipe).select_related('similar')
+        ]
+        return Response(
+            ShowRecipeAddedSerializer(
+                similar,
+                many=True,
+                context={'request': request}
+            ).data
+        )
+
+
+class RecipeCacheStatsView(APIView):
+    permission_classes = [IsAdminUser, ]
+
+    def get(self, request):
+        return Response(get_recipe_cache_stats())
+
 
 class FavoriteViewSet(APIView):
     permission_classes = [IsAuthenticated, ]
 
     def get(self, request, recipe_id):
-        user = request.user
-        data = {
-            'user': user.id,
-            'recipe': recipe_id,
-        }
-        serializer = FavoriteSerializer(
-            data=data,
-            context={'request': request}
-        )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        recipe = get_object_or_404(Recipe, id=recipe_id)
+        with transaction.atomic():
+            if not add_relation(Favorite, user=request.user, recipe=recipe):
+                raise ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY:
+                        ['Рецепт уже добавлен в избранное']
+                })
+            change_counter(Favorite, recipe.id, 1)
+            invalidate_user_relations(request.user.id)
         return Response(
-            serializer.data,
+            ShowRecipeAddedSerializer(
+                recipe,
+                context={'request': request}
+            ).data,
             status=status.HTTP_201_CREATED
         )
 
     def delete(self, request, recipe_id):
-        user = request.user
-        get_object_or_404(
-            Favorite,
-            user=user,
-            recipe__id=recipe_id).delete()
+        with transaction.atomic():
+            if not remove_relation(Favorite, user=request.user,
+                                   recipe_id=recipe_id):
+                raise Http404
+            change_counter(Favorite, recipe_id, -1)
+            invalidate_user_relations(request.user.id)
         return Response(
             status=status.HTTP_204_NO_CONTENT
         )
@@ -91,29 +280,33 @@ class ShoppingCartViewSet(APIView):
 
     def get(self, request, recipe_id):
         user = request.user
-        data = {
-            'user': user.id,
-            'recipe': recipe_id,
-        }
-
-        context = {'request': request}
-        serializer = ShoppingCartSerializer(
-            data=data,
-            context=context
-        )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        recipe = get_object_or_404(Recipe, id=recipe_id)
+        with transaction.atomic():
+            if not add_relation(ShoppingCart, user=user, recipe=recipe):
+                raise ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY:
+                        ['Продукты уже в корзине']
+                })
+            change_counter(ShoppingCart, recipe.id, 1)
+            invalidate_user_relations(user.id)
+            add_to_shopping_list(user, recipe)
         return Response(
-            serializer.data,
+            ShowRecipeAddedSerializer(
+                recipe,
+                context={'request': request}
+            ).data,
             status=status.HTTP_201_CREATED
         )
 
     def delete(self, request, recipe_id):
         user = request.user
-        get_object_or_404(
-            ShoppingCart,
-            user=user,
-            recipe__id=recipe_id).delete()
+        with transaction.atomic():
+            if not remove_relation(ShoppingCart, user=user,
+                                   recipe_id=recipe_id):
+                raise Http404
+            change_counter(ShoppingCart, recipe_id, -1)
+            invalidate_user_relations(user.id)
+            remove_from_shopping_list(user, recipe_id)
         return Response(
             status=status.HTTP_204_NO_CONTENT
         )
@@ -122,27 +315,25 @@ class ShoppingCartViewSet(APIView):
 class DownloadShoppingCart(APIView):
     permission_classes = (IsAuthenticated,)
 
+    def perform_content_negotiation(self, request, force=False):
+        return super().perform_content_negotiation(request, force=True)
+
+    @method_decorator(condition(etag_func=shopping_list_etag))
     def get(self, request):
-        buying_list = {}
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=request.user).values_list(
-            'ingredient__name', 'amount', 'ingredient__measurement_unit')
-        ingredients = ingredients.values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(total=Sum('amount'))
-        for ingredient in ingredients:
-            amount = ingredient['total']
-            name = ingredient['ingredient__name']
-            measurement_unit = ingredient['ingredient__measurement_unit']
-            buying_list[name] = {'measurement_unit': measurement_unit,
-                                 'amount': amount}
-        wishlist = []
-        for item in buying_list:
-            wishlist.append(f'{item} - {buying_list[item]["amount"]} '
-                            f'{buying_list[item]["measurement_unit"]} \n')
-
-        response = HttpResponse(wishlist, 'Content-Type: text/plain')
-        response['Content-Disposition'] = 'attachment; filename="wishlist.txt"'
+        export_format = request.query_params.get('format', DEFAULT_FORMAT)
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError(
+                {'format': f'Доступные форматы: '
+                           f'{", ".join(EXPORT_FORMATS)}'}
+            )
+        response = StreamingHttpResponse(
+            STREAMERS[export_format](get_shopping_list(request.user)),
+            content_type=EXPORT_FORMATS[export_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="wishlist.{export_format}"'
+        )
+        patch_cache_control(response, private=True, no_cache=True)
         return response
 
 
@@ -151,14 +342,29 @@ class ListFollowViewSet(generics.ListAPIView):
     permission_classes = [IsAuthenticated, ]
     serializer_class = ShowFollowSerializer
 
+    recipes_by_author = None
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
-        context.update({'request': self.request})
+        context.update({'request': self.request,
+                        'recipes_by_author': self.recipes_by_author})
         return context
 
     def get_queryset(self):
         user = self.request.user
-        return User.objects.filter(following__user=user)
+        return User.objects.filter(
+            following__user=user).order_by('username')
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        authors = page if page is not None else queryset
+        limit = get_recipes_limit(self.request)
+        self.recipes_by_author = defaultdict(list)
+        if limit:
+            for recipe in Recipe.objects.latest_by_author(
+                    [author.id for author in authors], limit):
+                self.recipes_by_author[recipe.author_id].append(recipe)
+        return page
 
 
 class FollowViewSet(APIView):
@@ -166,31 +372,31 @@ class FollowViewSet(APIView):
 
     def get(self, request, author_id):
         user = request.user
-
-        data = {
-            'user': user.id,
-            'author': author_id
-        }
-        serializer = FollowSerializer(
-            data=data,
-            context={'request': request}
-        )
-
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        author = get_object_or_404(User, id=author_id)
+        with transaction.atomic():
+            if author == user or not add_relation(Follow, user=user,
+                                                  author=author):
+                raise ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY: ['Подписка существует']
+                })
+            change_counter(Follow, author.id, 1)
+            invalidate_user_relations(user.id)
+            backfill_feed(user, author.id)
         return Response(
-            serializer.data,
+            ShowFollowSerializer(
+                author,
+                context={'request': request}
+            ).data,
             status=status.HTTP_201_CREATED)
 
     def delete(self, request, author_id):
-        user = request.user
-        obj = get_object_or_404(
-            Follow,
-            user=user,
-            author__id=author_id
-        )
-        obj.delete()
-
+        with transaction.atomic():
+            if not remove_relation(Follow, user=request.user,
+                                   author_id=author_id):
+                raise Http404
+            change_counter(Follow, author_id, -1)
+            invalidate_user_relations(request.user.id)
+            clear_feed(request.user, author_id)
         return Response(
             status=status.HTTP_204_NO_CONTENT
         )
@@ -0,0 +1,125 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MigrationTestCase(TransactionTestCase):
+    migrate_from = None
+    migrate_to = None
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.leaf_nodes = executor.loader.graph.leaf_nodes()
+        self.other_nodes = [
+            node for node in self.leaf_nodes if node[0] != 'recipes'
+        ]
+        executor.migrate([self.migrate_from])
+        self.apps = executor.loader.project_state(
+            [self.migrate_from, *self.other_nodes]
+        ).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.leaf_nodes)
+
+    def migrate(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate([self.migrate_to])
+        return executor.loader.project_state(
+            [self.migrate_to, *self.other_nodes]
+        ).apps
+
+    def objects(self, model, apps=None):
+        app_label = 'users' if model == 'User' else 'recipes'
+        return (apps or self.apps).get_model(app_label, model).objects
+
+
+class ShoppingListBackfillTest(MigrationTestCase):
+    migrate_from = ('recipes', '0003_recipe_updated_at')
+    migrate_to = ('recipes', '0004_shoppinglistitem')
+
+    def create_recipe(self, author, ingredients):
+        recipe = self.objects('Recipe').create(
+            author=author, name='Рецепт', image='recipes/images/recipe.gif',
+            text='Описание', cooking_time=10
+        )
+        for ingredient, amount in ingredients:
+            self.objects('RecipeIngredient').create(
+                recipe=recipe, ingredient=ingredient, amount=amount
+            )
+        return recipe
+
+    def shopping_list(self, apps, user):
+        return set(self.objects('ShoppingListItem', apps).filter(
+            user_id=user.id
+        ).values_list('name', 'measurement_unit', 'amount'))
+
+    def test_backfill_sums_each_ingredient_once(self):
+        ingredients = self.objects('Ingredient')
+        user = self.objects('User').create(email='user@example.com',
+                                           username='user')
+        flour = ingredients.create(name='мука', measurement_unit='г')
+        salt = ingredients.create(name='соль', measurement_unit='г')
+        sugar = ingredients.create(name='сахар', measurement_unit='г')
+        for recipe in (
+            self.create_recipe(user, [(flour, 12), (salt, 1), (sugar, 5)]),
+            self.create_recipe(user, [(flour, 1000), (salt, 2)]),
+        ):
+            self.objects('ShoppingCart').create(user=user, recipe=recipe)
+        apps = self.migrate()
+        self.assertEqual(self.shopping_list(apps, user), {
+            ('мука', 'г', 1012), ('соль', 'г', 3), ('сахар', 'г', 5),
+        })
+
+    def test_backfill_merges_kilograms_into_grams(self):
+        ingredients = self.objects('Ingredient')
+        user = self.objects('User').create(email='user@example.com',
+                                           username='user')
+        grams = ingredients.create(name='мука', measurement_unit='г')
+        kilograms = ingredients.create(name='мука', measurement_unit='кг')
+        litres = ingredients.create(name='молоко', measurement_unit='л')
+        for recipe in (
+            self.create_recipe(user, [(grams, 12), (litres, 1)]),
+            self.create_recipe(user, [(kilograms, 1)]),
+        ):
+            self.objects('ShoppingCart').create(user=user, recipe=recipe)
+        apps = self.migrate()
+        self.assertEqual(self.shopping_list(apps, user), {
+            ('мука', 'г', 1012), ('молоко', 'мл', 1000),
+        })
+
+
+class CounterBackfillTest(MigrationTestCase):
+    migrate_from = ('recipes', '0004_shoppinglistitem')
+    migrate_to = ('recipes', '0005_recipe_counters')
+
+    def test_backfill_counts_relations(self):
+        users = [
+            self.objects('User').create(email=f'user{index}@example.com',
+                                        username=f'user{index}')
+            for index in range(3)
+        ]
+        recipes = [
+            self.objects('Recipe').create(
+                author=users[0], name='Рецепт',
+                image='recipes/images/recipe.gif', text='Описание',
+                cooking_time=10
+            )
+            for _ in range(2)
+        ]
+        for user in users:
+            self.objects('Favorite').create(user=user, recipe=recipes[0])
+        self.objects('ShoppingCart').create(user=users[1], recipe=recipes[1])
+        self.objects('Follow').create(user=users[1], author=users[0])
+        self.objects('Follow').create(user=users[2], author=users[0])
+        apps = self.migrate()
+        self.assertEqual(list(self.objects('Recipe', apps).order_by(
+            'id'
+        ).values_list('favorites_count', 'shopping_cart_count')), [
+            (3, 0), (0, 1),
+        ])
+        self.assertEqual(list(self.objects('User', apps).order_by(
+            'id'
+        ).values_list('recipes_count', 'followers_count')), [
+            (2, 2), (0, 0), (0, 0),
+        ])
@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from recipes.management.commands.explain_queries import (HOT_QUERY_INDEXES,
+                                                         check_plan,
+                                                         explain,
+                                                         force_index_scans,
+                                                         hot_queries)
+from recipes.models import (Favorite, FeedEntry, Follow, Ingredient,
+                            IngredientPair, ReceiptTag, Recipe,
+                            RecipeIngredient, ShoppingCart, SimilarRecipe,
+                            Tag)
+
+User = get_user_model()
+
+
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            User.objects.create_user(
+                email=f'user{index}@example.com', username=f'user{index}',
+                password='password'
+            )
+            for index in range(3)
+        ]
+        tags = [
+            Tag.objects.create(name=f'Тег {index}', color='#FFFFFF',
+                               slug=f'tag{index}')
+            for index in range(2)
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {index}',
+                                      measurement_unit='г')
+            for index in range(3)
+        ]
+        recipes = [
+            Recipe.objects.create(
+                author=users[index % 2], name=f'Рецепт {index}',
+                image='recipes/images/recipe.gif', text='Описание',
+                cooking_time=10
+            )
+            for index in range(6)
+        ]
+        for recipe in recipes:
+            ReceiptTag.objects.create(recipe=recipe, tag=tags[0])
+            for ingredient in ingredients[:2]:
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=100
+                )
+            Favorite.objects.create(user=users[0], recipe=recipe)
+            ShoppingCart.objects.create(user=users[0], recipe=recipe)
+            FeedEntry.objects.create(
+                user=users[2], recipe=recipe, author=recipe.author,
+                pub_date=timezone.now()
+            )
+        Follow.objects.create(user=users[2], author=users[0])
+        Follow.objects.create(user=users[1], author=users[0])
+        SimilarRecipe.objects.create(
+            recipe=recipes[0], similar=recipes[1], score=0.5
+        )
+        IngredientPair.objects.create(
+            ingredient=ingredients[0], other=ingredients[1], count=6
+        )
+
+    def setUp(self):
+        force_index_scans()
+        self.queries = hot_queries()
+
+    def assert_uses_index(self, name):
+        plan = explain(self.queries[name])
+        self.assertIn(HOT_QUERY_INDEXES[name], plan, plan)
+
+    def test_recipe_list_uses_pub_date_index(self):
+        self.assert_uses_index('recipes_latest')
+
+    def test_author_filter_uses_author_pub_date_index(self):
+        self.assert_uses_index('recipes_by_author')
+
+    def test_popular_ordering_uses_popular_index(self):
+        self.assert_uses_index('recipes_popular')
+
+    def test_tag_lookup_uses_tag_recipe_index(self):
+        self.assert_uses_index('recipes_by_tag')
+
+    def test_followers_use_author_user_index(self):
+        self.assert_uses_index('followers')
+
+    def test_favorites_use_user_added_index(self):
+        self.assert_uses_index('favorites_by_user')
+
+    def test_shopping_cart_uses_user_added_index(self):
+        self.assert_uses_index('cart_by_user')
+
+    def test_feed_uses_user_pub_date_index(self):
+        self.assert_uses_index('feed')
+
+    def test_similar_recipes_use_score_index(self):
+        self.assert_uses_index('similar_recipes')
+
+    def test_ingredient_pairs_use_count_index(self):
+        self.assert_uses_index('ingredient_pairs')
+
+    def test_hot_queries_have_no_plan_problems(self):
+        for name, queryset in self.queries.items():
+            with self.subTest(name):
+                plan = explain(queryset)
+                self.assertEqual(check_plan(name, plan), [], plan)
@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from recipes.models import Recipe
+from recipes.search import search_recipes
+
+User = get_user_model()
+
+
+class RecipeSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='user@example.com', username='user', password='password'
+        )
+        cls.pie, cls.soup = [
+            Recipe.objects.create(
+                author=author, name=name, text=text,
+                image='recipes/images/recipe.gif', cooking_time=10
+            )
+            for name, text in (
+                ('Пирог с капустой', 'Тесто и капуста'),
+                ('Суп', 'Подать с пирогом'),
+            )
+        ]
+
+    def search(self, value):
+        return list(search_recipes(Recipe.objects.all(), value))
+
+    def test_search_ignores_case_of_cyrillic_words(self):
+        for value in ('пирог', 'ПИРОГ'):
+            with self.subTest(value):
+                self.assertIn(self.pie, self.search(value))
+
+    def test_name_matches_rank_first(self):
+        self.assertEqual(self.search('пирог'), [self.pie, self.soup])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.search('ПИРОГ капустой'), [self.pie])
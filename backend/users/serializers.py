@@ -3,7 +3,7 @@ from django.contrib.auth import get_user_model
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 
-from recipes.models import Follow
+from recipes.relations import get_user_relations
 
 User = get_user_model()
 
@@ -33,12 +33,10 @@ class UserDetailSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
+        relations = get_user_relations(self.context.get('request'))
+        if relations is None:
             return False
-        return Follow.objects.filter(
-            user=request.user,
-            author=obj).exists()
+        return obj.id in relations['following']
 
 
 class AuthTokenSerializer(serializers.Serializer):